@@ -1,26 +1,38 @@
-import cv2
-import numpy as np
-from moviepy import VideoFileClip
-from PIL import Image
+# Heavy media/ML modules (cv2, numpy, moviepy, PIL, openai, requests) are imported
+# inside the functions that use them so that importing this module - which happens
+# at URLconf load - stays cheap. Call warm_up() to pay that cost ahead of time.
+from __future__ import annotations
+
 import base64
 import io
 import os
-from openai import OpenAI
-from skimage.metrics import structural_similarity as ssim
-import tempfile
-from typing import Dict, List, Tuple, Any
+import socket
+import threading
+from contextlib import nullcontext
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple, Any
 import json
 
+from baby_shield_backend.audio import analyze_audio
+from baby_shield_backend.decoders import MAX_FRAME_SIDE, get_decoder
+from baby_shield_backend.governor import estimate_tokens, llm_governor
+from baby_shield_backend.hedging import hedge_policy
+from baby_shield_backend.orchestration import AgentCancelled, CancelToken, run_tasks
 
-import requests
-import os
+if TYPE_CHECKING:
+    import numpy as np
 
-BASE_ADK_URL = "https://shield-agent-service-952359417443.us-central1.run.app"
+BASE_ADK_URL = os.environ.get("BASE_ADK_URL", "https://shield-agent-service-952359417443.us-central1.run.app")
 APP_NAME = "shield-agent-app"
 USER_ID = "TEST_USER"
 SESSION_ID = "TEST_SESSION"
 
+# Route analysis through the ADK service instead of the direct OpenAI agents
+USE_ADK = os.environ.get("USE_ADK") == "1"
+
 def create_session():
+    import requests
+
     headers = {
         'Content-Type': 'application/json',
     }
@@ -35,7 +47,9 @@ def create_session():
     print(response.text)
     
 
-def get_response_adk(frames, audio_path):
+def get_response_adk(frames):
+    import requests
+
     create_session()
     headers = {
         'Content-Type': 'application/json',
@@ -92,77 +106,178 @@ def get_response_adk(frames, audio_path):
 
     return data
 
-# Initialize OpenAI client (make sure to set OPENAI_API_KEY environment variable)
-client = OpenAI()
+_client = None
+_client_lock = threading.Lock()
 
-def extract_smart_frames(video_path: str, max_frames: int = 25) -> List[np.ndarray]:
+def get_client():
     """
-    Extract frames intelligently using scene change detection and content diversity.
-    Uses structural similarity to avoid duplicate frames.
+    Shared OpenAI client, built on first use (make sure to set OPENAI_API_KEY
+    environment variable). The client is thread-safe; its connection pool is
+    sized for the governor's concurrency plus hedges. Retries are left to the
+    governor, which needs to see 429s.
     """
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise ValueError(f"Could not open video file: {video_path}")
-    
-    frames = []
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    duration = frame_count / fps
-    
-    # Calculate frame intervals for sampling
-    interval = fps * 2 
-    prev_frame_gray = None
-    selected_frames = []
-    
-    frame_idx = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        if frame_idx % interval == 0:
-            # Convert to grayscale for comparison
-            selected_frames.append(frame)
-            
-        frame_idx += 1
-    
-    cap.release()
-    
-    return selected_frames
-
-def extract_audio_segment(video_path: str, duration_seconds: int = 30) -> str:
+    global _client
+    if _client is not None:
+        return _client
+    # The first request's agent threads all get here at once; build only one client
+    with _client_lock:
+        if _client is None:
+            import httpx
+            from openai import DefaultHttpxClient, OpenAI
+
+            max_connections = llm_governor.max_concurrency * 2
+            client = OpenAI(
+                max_retries=0,
+                http_client=DefaultHttpxClient(
+                    limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                ),
+            )
+            _prime_stream_parser()
+            _client = client
+    return _client
+
+def _prime_stream_parser() -> None:
+    """
+    Build the SDK's event-type lookup for streamed responses on one thread.
+    The SDK builds it lazily on the first parsed event. When the agent threads
+    stream their first calls at once, the build can race and cache an
+    incomplete table: response.completed then parses as the wrong event type,
+    for the rest of the process.
+    """
+    from openai._models import construct_type
+    from openai.types.responses import ResponseStreamEvent
+
+    construct_type(type_=ResponseStreamEvent, value={"type": "response.completed"})
+
+def warm_up() -> None:
+    """Import the heavy modules and build the client ahead of the first request."""
+    import cv2  # noqa: F401
+    import numpy  # noqa: F401
+    import PIL.Image  # noqa: F401
+    import requests  # noqa: F401
+    get_client()
+
+# Optional cap on concurrent LLM calls; the warm_cache command shares one across worker processes
+_llm_semaphore = None
+
+def set_llm_semaphore(semaphore) -> None:
+    global _llm_semaphore
+    _llm_semaphore = semaphore
+
+def _create_response(cancel_token: Optional[CancelToken] = None, **kwargs):
+    # Hard per-attempt timeout so a hedged loser doesn't linger
+    kwargs.setdefault("timeout", hedge_policy.timeout)
+    with _llm_semaphore or nullcontext():
+        if cancel_token is None:
+            raw = get_client().responses.with_raw_response.create(**kwargs)
+            llm_governor.observe(raw.headers)
+            return raw.parse()
+        return _stream_response(cancel_token, **kwargs)
+
+def _stream_response(cancel_token: CancelToken, **kwargs):
     """
-    Extract a representative audio segment from the video.
-    Returns path to temporary audio file.
+    Cancellable call: stream the response so that cancelling the token drops
+    the connection mid-flight (the provider stops generating) instead of
+    waiting for the full answer.
     """
+    cancel_token.raise_if_cancelled()
+    stream = get_client().responses.create(stream=True, **kwargs)
+    abort = lambda: _abort_stream(stream)
+    cancel_token.register(abort)
     try:
-        video = VideoFileClip(video_path)
-        audio = video.audio
-        
-        if audio is None:
-            return None
-        
-        # Save to temporary file
-        temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        audio.write_audiofile(temp_audio.name, logger=None)
-        
-        audio.close()
-        video.close()
-        
-        return temp_audio.name
+        llm_governor.observe(stream.response.headers)
+        for event in stream:
+            if event.type in ("response.completed", "response.incomplete"):
+                return event.response
+            if event.type in ("response.failed", "error"):
+                raise RuntimeError(f"LLM call failed: {event}")
+        cancel_token.raise_if_cancelled()
+        raise RuntimeError("LLM stream ended without a response")
+    except AgentCancelled:
+        raise
     except Exception as e:
-        print(f"Error extracting audio: {e}")
-        return None
+        if cancel_token.is_cancelled:
+            raise AgentCancelled() from e
+        raise
+    finally:
+        cancel_token.unregister(abort)
+        stream.close()
+
+def _abort_stream(stream) -> None:
+    """
+    Cancel callback, run on the orchestrator's thread while the agent thread
+    is blocked reading the stream. Closing the socket from here neither wakes
+    that read nor tells the provider, so shut the connection down instead: the
+    read returns at once and the provider sees the disconnect. The agent
+    thread closes the stream itself.
+    """
+    network_stream = stream.response.extensions.get("network_stream")
+    sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+    if sock is None:
+        stream.close()
+        return
+    try:
+        # socket.socket's shutdown, not SSLSocket's, which also drops the TLS state the reader is using
+        socket.socket.shutdown(sock, socket.SHUT_RDWR)
+    except OSError:
+        # Already closed
+        pass
+
+def create_response(agent: str, cancel_token: Optional[CancelToken] = None, **kwargs):
+    """
+    Single entry point for agent LLM calls: hedged per agent (see hedging.py),
+    with every upstream attempt admitted by the process-wide governor (see
+    governor.py) and holding its slot until that attempt ends.
+    A cancel_token (see orchestration.py) lets the orchestrator drop the call
+    while it is queued or in flight.
+    """
+    tokens = estimate_tokens(kwargs.get("input"), kwargs.get("max_output_tokens", 0))
+
+    def attempt():
+        # Each attempt (primary or hedge) was charged the estimate; settle its own usage
+        response = _create_response(cancel_token, **kwargs)
+        usage = getattr(response, "usage", None)
+        llm_governor.settle_tokens(tokens, getattr(usage, "total_tokens", None))
+        return response
+
+    return llm_governor.run(
+        lambda admit: hedge_policy.call(
+            agent,
+            attempt,
+            slot=admit,
+            hedge_slot=lambda: llm_governor.try_acquire(tokens),
+        ),
+        tokens,
+        cancel_token,
+    )
+
+def extract_smart_frames(video_path: str, max_frames: int = 25) -> Iterator[np.ndarray]:
+    """
+    Lazily sample one frame every SAMPLE_INTERVAL_SECONDS through the configured
+    decoder backend, stopping after max_frames. Frames come back already scaled
+    to at most MAX_FRAME_SIDE pixels and may live in a reused decoder buffer,
+    so consume each one before pulling the next.
+    """
+    decoder = get_decoder()
+    frames = decoder.iter_frames(video_path)
+    try:
+        yield from islice(frames, max_frames)
+    finally:
+        # Stops the decoder (and its ffmpeg process) when we quit early
+        frames.close()
 
 def encode_frame_to_base64(frame: np.ndarray) -> str:
     """Convert OpenCV frame to base64 encoded image."""
+    import cv2
+    from PIL import Image
+
     # Convert BGR to RGB
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     pil_image = Image.fromarray(frame_rgb)
     
     # Resize for API efficiency (max 512px on longest side)
     width, height = pil_image.size
-    max_size = 512
+    max_size = MAX_FRAME_SIDE
     if max(width, height) > max_size:
         ratio = max_size / max(width, height)
         new_size = (int(width * ratio), int(height * ratio))
@@ -175,7 +290,12 @@ def encode_frame_to_base64(frame: np.ndarray) -> str:
     
     return img_base64
 
-def playback_speed_agent(frames: List[str]) -> Dict[str, Any]:
+def encode_frames(frames: Iterable[np.ndarray]) -> Iterator[str]:
+    """Encode frames one at a time so only the current raw frame is alive."""
+    for frame in frames:
+        yield encode_frame_to_base64(frame)
+
+def playback_speed_agent(frames: List[str], cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
     """
     Agent 1: Analyze if video needs slower playback for babies.
     """
@@ -214,7 +334,9 @@ def playback_speed_agent(frames: List[str]) -> Dict[str, Any]:
             "image_url": f"data:image/jpeg;base64,{frame_b64}"
         })
     
-    response = client.responses.create(
+    response = create_response(
+        "playback_speed_agent",
+        cancel_token=cancel_token,
         # model="gpt-4o",  # Using GPT-4 Vision as GPT-5 isn't available yet
         model="gpt-4.1",  # Using GPT-4 Vision as GPT-5 isn't available yet
         instructions=system_prompt,
@@ -226,7 +348,7 @@ def playback_speed_agent(frames: List[str]) -> Dict[str, Any]:
     result = json.loads(response.output[0].content[0].text)
     return result
 
-def color_contrast_agent(frames: List[str]) -> Dict[str, Any]:
+def color_contrast_agent(frames: List[str], cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
     """
     Agent 2: Analyze if colors/contrast should be reduced for babies.
     """
@@ -266,7 +388,9 @@ def color_contrast_agent(frames: List[str]) -> Dict[str, Any]:
             "image_url": f"data:image/jpeg;base64,{frame_b64}"
         })
     
-    response = client.responses.create(
+    response = create_response(
+        "color_contrast_agent",
+        cancel_token=cancel_token,
         # model="gpt-4o",  # Using GPT-4 Vision as GPT-5 isn't available yet
         model="gpt-4.1",
         instructions=system_prompt,
@@ -278,7 +402,7 @@ def color_contrast_agent(frames: List[str]) -> Dict[str, Any]:
     result = json.loads(response.output[0].content[0].text)
     return result
 
-def content_safety_agent(frames: List[str], audio_path: str = None) -> Dict[str, Any]:
+def content_safety_agent(frames: List[str], cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
     """
     Agent 3: Analyze for explicit or inappropriate content for babies.
     """
@@ -327,7 +451,9 @@ def content_safety_agent(frames: List[str], audio_path: str = None) -> Dict[str,
     #         "text": "Note: This video also contains audio. Please consider that audio content should also be evaluated for appropriateness, though audio analysis is not provided here."
     #     })
     
-    response = client.responses.create(
+    response = create_response(
+        "content_safety_agent",
+        cancel_token=cancel_token,
         # model="gpt-4o",  # Using GPT-4 Vision as GPT-5 isn't available yet
         model="gpt-4.1",  # Using GPT-4 Vision as GPT-5 isn't available yet
         instructions=system_prompt,
@@ -354,30 +480,28 @@ def process_video(video_path: str) -> Dict[str, Any]:
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video file not found: {video_path}")
         
-        print("Extracting smart frames from video...")
-        frames = extract_smart_frames(video_path, max_frames=8)
-        
-        print("Encoding frames for AI analysis...")
-        encoded_frames = [encode_frame_to_base64(frame) for frame in frames]
-        
-        print("Extracting audio segment...")
-        audio_path = extract_audio_segment(video_path)
-        
-        print("Running AI analysis agents...")
+        print("Extracting and encoding frames for AI analysis...")
+        # decode -> select -> resize -> encode as one generator chain; only the
+        # (small) base64 strings are kept, never the raw frames
+        encoded_frames = list(encode_frames(extract_smart_frames(video_path, max_frames=8)))
         
-        # use_adk = True
-        use_adk = False
-        if not use_adk:
-            from concurrent.futures import ThreadPoolExecutor, as_completed
+        # The agents only see frames; the audio track is streamed as low-rate PCM
+        # into the loudness analyzer instead
 
-            with ThreadPoolExecutor(max_workers=3) as executor:
-                f_playback = executor.submit(playback_speed_agent, encoded_frames)
-                f_contrast = executor.submit(color_contrast_agent, encoded_frames)
-                f_safety = executor.submit(content_safety_agent, encoded_frames, audio_path)
-
-                playback_analysis = f_playback.result()
-                contrast_analysis = f_contrast.result()
-                safety_analysis = f_safety.result()
+        print("Running AI analysis agents and audio loudness analysis...")
+        
+        if not USE_ADK:
+            # Agents that a decided verdict makes redundant are cancelled (see orchestration.py)
+            analyses, skipped = run_tasks({
+                "playback_speed_analysis": lambda token: playback_speed_agent(encoded_frames, cancel_token=token),
+                "color_contrast_analysis": lambda token: color_contrast_agent(encoded_frames, cancel_token=token),
+                "content_safety_analysis": lambda token: content_safety_agent(encoded_frames, cancel_token=token),
+                "audio_loudness_analysis": lambda token: analyze_audio(video_path),
+            })
+            playback_analysis = analyses["playback_speed_analysis"]
+            contrast_analysis = analyses["color_contrast_analysis"]
+            safety_analysis = analyses["content_safety_analysis"]
+            audio_analysis = analyses["audio_loudness_analysis"]
 
 
             # # Run all three agents in parallel (conceptually)
@@ -385,31 +509,32 @@ def process_video(video_path: str) -> Dict[str, Any]:
             # contrast_analysis = color_contrast_agent(encoded_frames)
             # safety_analysis = content_safety_agent(encoded_frames, audio_path)
             
-            # Clean up temporary audio file
-            if audio_path and os.path.exists(audio_path):
-                os.unlink(audio_path)
-            
-            
             # Compile results
             results = {
                 "video_path": video_path,
                 "analysis_timestamp": "2025-09-27",  # You could use datetime.now()
-                "frames_analyzed": len(frames),
+                "frames_analyzed": len(encoded_frames),
                 "playback_speed_analysis": playback_analysis,
                 "color_contrast_analysis": contrast_analysis,
                 "content_safety_analysis": safety_analysis,
+                "audio_loudness_analysis": audio_analysis,
+                "skipped_analyses": skipped,
                 "overall_recommendation": {
                     "safe_for_babies": not safety_analysis.get("contains_inappropriate_content", True),
                     "requires_modifications": (
                         playback_analysis.get("needs_slower_playback", False) or 
-                        contrast_analysis.get("needs_reduced_contrast", False)
+                        contrast_analysis.get("needs_reduced_contrast", False) or
+                        audio_analysis.get("needs_volume_cap", False)
                     ),
                     "summary": "Video analysis complete. Check individual agent results for detailed recommendations."
                 }
             }
             return results
         else:
-            return get_response_adk(encoded_frames, audio_path)
+            results = get_response_adk(encoded_frames)
+            # The ADK service only sees frames; loudness is always analyzed locally
+            results["audio_loudness_analysis"] = analyze_audio(video_path)
+            return results
         
     except Exception as e:
         import traceback
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'baby_shield_backend.settings')
 
 application = get_asgi_application()
+
+# Opt-in: pay the heavy import and client construction cost at boot instead of on the first request
+if os.environ.get('WARM_UP_ON_START') == '1':
+    from baby_shield_backend.ai import warm_up
+    warm_up()
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict
+
+from baby_shield_backend.decoders import AUDIO_SAMPLE_RATE, iter_pcm_chunks
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Loudness is tracked in 100 ms blocks; momentary (400 ms) and short-term (3 s)
+# windows follow the EBU R128 lengths, but without K-weighting, so values are
+# "LUFS-style" (unweighted mean-square, -0.691 dB offset). Until 3 s have been
+# seen, short-term loudness is taken over whatever is available (at least a
+# momentary window), so clips cut to a few seconds are covered from the start.
+BLOCK_SECONDS = 0.1
+MOMENTARY_BLOCKS = 4
+SHORT_TERM_BLOCKS = 30
+
+# A startle sound: a 100 ms block at least STARTLE_JUMP_DB above the mean of the
+# preceding second, and loud in absolute terms. Near the start of a clip the mean
+# is taken over what has been heard, but at least STARTLE_MIN_BASELINE_BLOCKS of
+# it: a clip that simply opens at a normal level is not a startle.
+STARTLE_BASELINE_BLOCKS = 10
+STARTLE_MIN_BASELINE_BLOCKS = 3
+STARTLE_JUMP_DB = 18.0
+STARTLE_MIN_LEVEL_DB = -24.0
+STARTLE_MIN_GAP_SECONDS = 1.0
+
+# Sustained loudness: short-term loudness stays above this for SUSTAINED_LOUD_SECONDS,
+# or for SUSTAINED_LOUD_FRACTION of clips too short for that (downloads are cut to 5 s)
+LOUD_SHORT_TERM_LUFS = -14.0
+SUSTAINED_LOUD_SECONDS = 3.0
+SUSTAINED_LOUD_FRACTION = 0.6
+
+# Volume cap brings the loudest momentary window down to this level
+TARGET_MAX_MOMENTARY_LUFS = -20.0
+MIN_VOLUME = 0.2
+
+# Blocks below this are silence: ignored for the integrated level and as a baseline floor
+SILENCE_DB = -70.0
+
+MAX_REPORTED_EVENTS = 20
+
+
+def to_db(mean_square: float) -> float:
+    return 10 * math.log10(mean_square) if mean_square > 0 else -math.inf
+
+
+class LoudnessAnalyzer:
+    """
+    Streaming loudness and startle-sound detector over mono PCM. Keeps only the
+    last few seconds of block energies, so memory is constant in clip length.
+    """
+
+    def __init__(self, sample_rate: int = AUDIO_SAMPLE_RATE):
+        import numpy as np
+
+        self.sample_rate = sample_rate
+        self.block_samples = int(sample_rate * BLOCK_SECONDS)
+        self._leftover = np.empty(0, dtype=np.float32)
+        self._recent = deque(maxlen=max(SHORT_TERM_BLOCKS, STARTLE_BASELINE_BLOCKS + 1))
+        self._blocks = 0
+        self._energy_sum = 0.0
+        self._energy_blocks = 0
+        self._peak = 0.0
+        self._max_momentary = -math.inf
+        self._max_short_term = -math.inf
+        self._loud_run = 0
+        self._max_loud_run = 0
+        self._events = []
+        self._event_count = 0
+        self._last_event_time = -math.inf
+
+    def feed(self, samples: np.ndarray) -> None:
+        """Consume a chunk of int16 samples (the chunk can be reused afterwards)."""
+        import numpy as np
+
+        x = samples.astype(np.float32) / 32768.0
+        if self._leftover.size:
+            x = np.concatenate((self._leftover, x))
+
+        n_blocks = x.size // self.block_samples
+        blocks = x[:n_blocks * self.block_samples].reshape(n_blocks, self.block_samples)
+        self._leftover = x[n_blocks * self.block_samples:].copy()
+        if not n_blocks:
+            return
+
+        mean_squares = np.einsum("ij,ij->i", blocks, blocks) / self.block_samples
+        peaks = np.abs(blocks).max(axis=1)
+        for mean_square, peak in zip(mean_squares.tolist(), peaks.tolist()):
+            self._add_block(mean_square, peak)
+
+    def _add_block(self, mean_square: float, peak: float) -> None:
+        time_s = self._blocks * BLOCK_SECONDS
+        level_db = to_db(mean_square)
+
+        # Startle check against (up to) the second before this block
+        if len(self._recent) >= STARTLE_MIN_BASELINE_BLOCKS:
+            baseline = list(self._recent)[-STARTLE_BASELINE_BLOCKS:]
+            baseline_db = max(to_db(sum(baseline) / len(baseline)), SILENCE_DB)
+            jump_db = level_db - baseline_db
+            if (jump_db >= STARTLE_JUMP_DB and level_db >= STARTLE_MIN_LEVEL_DB
+                    and time_s - self._last_event_time >= STARTLE_MIN_GAP_SECONDS):
+                self._event_count += 1
+                self._last_event_time = time_s
+                if len(self._events) < MAX_REPORTED_EVENTS:
+                    self._events.append({"time_seconds": round(time_s, 1), "jump_db": round(jump_db, 1)})
+
+        self._recent.append(mean_square)
+        self._blocks += 1
+        self._peak = max(self._peak, peak)
+        if level_db > SILENCE_DB:
+            self._energy_sum += mean_square
+            self._energy_blocks += 1
+
+        recent = list(self._recent)
+        if len(recent) >= MOMENTARY_BLOCKS:
+            momentary = to_db(sum(recent[-MOMENTARY_BLOCKS:]) / MOMENTARY_BLOCKS) - 0.691
+            self._max_momentary = max(self._max_momentary, momentary)
+            window = recent[-SHORT_TERM_BLOCKS:]
+            short_term = to_db(sum(window) / len(window)) - 0.691
+            self._max_short_term = max(self._max_short_term, short_term)
+            self._loud_run = self._loud_run + 1 if short_term >= LOUD_SHORT_TERM_LUFS else 0
+            self._max_loud_run = max(self._max_loud_run, self._loud_run)
+
+    def result(self) -> Dict[str, Any]:
+        """Verdict for everything fed so far."""
+        if not self._blocks:
+            return {"audio_available": False, "needs_volume_cap": False, "recommended_volume": 1.0}
+
+        def rounded(value):
+            return round(value, 1) if math.isfinite(value) else None
+
+        duration = self._blocks * BLOCK_SECONDS
+        sustained_seconds = self._max_loud_run * BLOCK_SECONDS
+        has_startle = self._event_count > 0
+        required_seconds = min(SUSTAINED_LOUD_SECONDS, SUSTAINED_LOUD_FRACTION * duration)
+        is_sustained_loud = self._max_loud_run > 0 and sustained_seconds >= required_seconds
+
+        volume = 1.0
+        if (has_startle or is_sustained_loud) and math.isfinite(self._max_momentary):
+            volume = 10 ** ((TARGET_MAX_MOMENTARY_LUFS - self._max_momentary) / 20)
+            volume = round(min(max(volume, MIN_VOLUME), 1.0), 2)
+        # Nothing to cap if the loudest window is already under the target
+        needs_cap = volume < 1.0
+
+        integrated = to_db(self._energy_sum / self._energy_blocks) - 0.691 if self._energy_blocks else -math.inf
+        return {
+            "audio_available": True,
+            "duration_seconds": round(duration, 1),
+            "integrated_lufs": rounded(integrated),
+            "max_momentary_lufs": rounded(self._max_momentary),
+            "max_short_term_lufs": rounded(self._max_short_term),
+            "peak_dbfs": rounded(20 * math.log10(self._peak) if self._peak > 0 else -math.inf),
+            "has_startle_sounds": has_startle,
+            "startle_event_count": self._event_count,
+            "startle_events": self._events,
+            "is_sustained_loud": is_sustained_loud,
+            "sustained_loud_seconds": round(sustained_seconds, 1),
+            "needs_volume_cap": needs_cap,
+            "recommended_volume": volume,
+        }
+
+
+def analyze_audio(video_path: str) -> Dict[str, Any]:
+    """
+    Stream the audio track through LoudnessAnalyzer. No model call; runs far
+    faster than real time on one core.
+    """
+    analyzer = LoudnessAnalyzer()
+    try:
+        for chunk in iter_pcm_chunks(video_path, chunk_samples=analyzer.sample_rate):
+            analyzer.feed(chunk)
+    except Exception as e:
+        print(f"Error analyzing audio: {e}")
+    return analyzer.result()
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import TYPE_CHECKING, Iterator, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Longest side of the frames handed to the agents (matches encode_frame_to_base64)
+MAX_FRAME_SIDE = 512
+
+# Seconds between sampled frames
+SAMPLE_INTERVAL_SECONDS = 2
+
+# "ffmpeg" or "opencv"; ffmpeg falls back to opencv when no binary is found
+DECODER_BACKEND = os.environ.get("DECODER_BACKEND", "ffmpeg")
+
+
+def scaled_size(width: int, height: int, max_side: int = MAX_FRAME_SIDE) -> Tuple[int, int]:
+    """Target (width, height) so the longest side is at most max_side."""
+    if max(width, height) <= max_side:
+        return width, height
+    ratio = max_side / max(width, height)
+    return max(int(width * ratio), 1), max(int(height * ratio), 1)
+
+
+def probe_video(video_path: str) -> Tuple[int, int, float]:
+    """
+    Read display width, height and fps from the container without decoding frames.
+    Width and height are swapped for 90/270 degree rotated sources, since both
+    backends auto-rotate.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    rotation = int(cap.get(cv2.CAP_PROP_ORIENTATION_META)) % 180
+    cap.release()
+
+    if rotation == 90:
+        width, height = height, width
+    return width, height, fps
+
+
+class OpenCVDecoder:
+    """Decodes every frame with cv2.VideoCapture and keeps one per interval."""
+
+    name = "opencv"
+
+    def iter_frames(self, video_path: str, interval_seconds: float = SAMPLE_INTERVAL_SECONDS,
+                    max_side: int = MAX_FRAME_SIDE) -> Iterator[np.ndarray]:
+        import cv2
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_path}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        interval = max(int(round(fps * interval_seconds)), 1)
+
+        try:
+            frame_idx = 0
+            while cap.grab():
+                # grab() decodes without the colour conversion; only retrieve sampled frames
+                if frame_idx % interval == 0:
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    height, width = frame.shape[:2]
+                    size = scaled_size(width, height, max_side)
+                    if size != (width, height):
+                        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                    yield frame
+
+                frame_idx += 1
+        finally:
+            cap.release()
+
+
+class FFmpegPipeDecoder:
+    """
+    Runs one ffmpeg process with fps and scale filters and reads fixed-size
+    bgr24 frames from its stdout. Full-resolution frames never reach Python.
+
+    Frames are read into a ring of buffer_frames preallocated buffers, so a
+    yielded frame is only valid until buffer_frames more have been read.
+    Consumers that keep frames around must copy them.
+    """
+
+    name = "ffmpeg"
+
+    def __init__(self, executable: Optional[str] = None, buffer_frames: int = 2):
+        self.executable = executable or find_ffmpeg()
+        self.buffer_frames = buffer_frames
+
+    def command(self, video_path: str, interval_seconds: float, size: Tuple[int, int]) -> list:
+        width, height = size
+        return [
+            self.executable,
+            "-nostdin",
+            "-loglevel", "error",
+            "-i", video_path,
+            "-an", "-sn", "-dn",
+            "-vf", f"fps=1/{interval_seconds},scale={width}:{height}:flags=area",
+            "-f", "rawvideo",
+            "-pix_fmt", "bgr24",
+            "pipe:1",
+        ]
+
+    def iter_frames(self, video_path: str, interval_seconds: float = SAMPLE_INTERVAL_SECONDS,
+                    max_side: int = MAX_FRAME_SIDE) -> Iterator[np.ndarray]:
+        import numpy as np
+
+        width, height, _ = probe_video(video_path)
+        if not width or not height:
+            raise ValueError(f"Could not read frame size of video file: {video_path}")
+        width, height = scaled_size(width, height, max_side)
+        frame_bytes = width * height * 3
+
+        # stderr goes to a file, not a pipe: a pipe nobody drains while stdout is
+        # being read fills up on a corrupt input and deadlocks ffmpeg against us
+        stderr = tempfile.TemporaryFile()
+        proc = subprocess.Popen(
+            self.command(video_path, interval_seconds, (width, height)),
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            bufsize=frame_bytes,
+        )
+        ring = [bytearray(frame_bytes) for _ in range(max(self.buffer_frames, 1))]
+        try:
+            frame_idx = 0
+            while True:
+                buffer = ring[frame_idx % len(ring)]
+                if not read_exact(proc.stdout, buffer):
+                    break
+                yield np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+                frame_idx += 1
+        finally:
+            proc.stdout.close()
+            proc.kill()
+            proc.wait()
+            with stderr:
+                stderr.seek(0)
+                errors = stderr.read()
+            if proc.returncode not in (0, -9) and errors:
+                print(f"ffmpeg decoder error: {errors.decode(errors='replace').strip()}")
+
+
+# Audio handed to the loudness analyzer: mono s16le at this rate
+AUDIO_SAMPLE_RATE = 16000
+
+
+def iter_pcm_chunks(video_path: str, chunk_samples: int, sample_rate: int = AUDIO_SAMPLE_RATE,
+                    executable: Optional[str] = None) -> Iterator[np.ndarray]:
+    """
+    Stream the audio track as downmixed, resampled int16 PCM from one ffmpeg
+    process, chunk_samples at a time, into a single reused buffer (a yielded
+    chunk is only valid until the next one is read). The final chunk may be
+    shorter. Yields nothing when there is no audio track or no ffmpeg.
+    """
+    import numpy as np
+
+    executable = executable or find_ffmpeg()
+    if executable is None:
+        return
+
+    proc = subprocess.Popen(
+        [
+            executable,
+            "-nostdin",
+            "-loglevel", "error",
+            "-i", video_path,
+            "-vn", "-sn", "-dn",
+            "-ac", "1",
+            "-ar", str(sample_rate),
+            "-f", "s16le",
+            "pipe:1",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    buffer = bytearray(chunk_samples * 2)
+    view = memoryview(buffer)
+    try:
+        while True:
+            filled = 0
+            while filled < len(view):
+                n = proc.stdout.readinto(view[filled:])
+                if not n:
+                    break
+                filled += n
+            # Whole samples only
+            filled -= filled % 2
+            if filled:
+                yield np.frombuffer(buffer, dtype=np.int16, count=filled // 2)
+            if filled < len(view):
+                break
+    finally:
+        proc.stdout.close()
+        proc.kill()
+        proc.wait()
+
+
+def read_exact(stream, buffer) -> bool:
+    """
+    Fill buffer from stream with readinto. Returns False on a clean EOF before
+    the first byte; a truncated trailing frame is dropped.
+    """
+    view = memoryview(buffer)
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+def find_ffmpeg() -> Optional[str]:
+    """ffmpeg on PATH, else the binary bundled with imageio-ffmpeg (a moviepy dependency)."""
+    path = shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+DECODER_BACKENDS = {
+    OpenCVDecoder.name: OpenCVDecoder,
+    FFmpegPipeDecoder.name: FFmpegPipeDecoder,
+}
+
+
+def get_decoder(name: Optional[str] = None):
+    """Build the configured decoder backend."""
+    name = name or DECODER_BACKEND
+    if name not in DECODER_BACKENDS:
+        raise ValueError(f"Unknown decoder backend: {name}")
+
+    if name == FFmpegPipeDecoder.name and find_ffmpeg() is None:
+        print("ffmpeg not found, falling back to OpenCV decoder")
+        name = OpenCVDecoder.name
+    return DECODER_BACKENDS[name]()
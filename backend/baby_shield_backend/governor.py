@@ -0,0 +1,278 @@
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, Optional
+
+
+# Ceiling and floor for the adaptive number of LLM calls in flight per process
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+LLM_MIN_CONCURRENCY = 1
+
+# Per-minute budgets; 0 means "learn them from the x-ratelimit-limit-* headers"
+LLM_REQUESTS_PER_MINUTE = int(os.environ.get("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = int(os.environ.get("LLM_TOKENS_PER_MINUTE", "0"))
+
+# How long a call may queue (including 429 back-off) before it gives up
+LLM_MAX_QUEUE_SECONDS = float(os.environ.get("LLM_MAX_QUEUE_SECONDS", "600"))
+
+# Back-off after a 429 without a usable retry-after / reset header
+DEFAULT_RETRY_AFTER_SECONDS = 2.0
+
+# Retries for transient (connection / 5xx) errors; 429s are retried until the queue deadline
+TRANSIENT_RETRIES = 2
+
+CANCEL_POLL_SECONDS = 0.25
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from a rate-limit header: plain seconds ("1.5") or OpenAI style ("6m0s", "20ms")."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; capacity None means unlimited."""
+
+    def __init__(self, per_minute: int = 0):
+        self.capacity = float(per_minute) if per_minute else None
+        self.level = self.capacity or 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if self.capacity is not None:
+            self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (0 if it is now)."""
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        if self.capacity is not None:
+            self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        if self.capacity is not None:
+            self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], now: float) -> None:
+        """Adopt the provider's view of the budget from response headers."""
+        if limit and self.capacity is None:
+            self.capacity = float(limit)
+            self.level = float(limit)
+        self._refill(now)
+        if remaining is not None and self.capacity is not None:
+            self.level = min(self.level, float(remaining))
+
+
+class LLMGovernor:
+    """
+    Process-wide admission control for LLM calls. A call waits (rather than
+    fails) until it fits under three limits:
+
+    - an adaptive concurrency limit: additive increase on success,
+      multiplicative decrease on 429 (AIMD)
+    - a requests-per-minute budget
+    - a tokens-per-minute budget, charged with an estimate up front and
+      settled against the reported usage afterwards
+
+    The budgets are kept in sync with the provider's x-ratelimit-* headers,
+    and a 429 pauses admissions for its retry-after before the call is queued
+    again.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+                 max_queue_seconds: float = LLM_MAX_QUEUE_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue_seconds = max_queue_seconds
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._stats = {"calls": 0, "rate_limited": 0, "transient_retries": 0, "queue_timeouts": 0}
+
+    def _wait_time(self, tokens: float, now: float) -> float:
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= int(self.limit):
+            # Woken by release()
+            return 1.0
+        return max(self._requests.wait_time(1, now), self._tokens.wait_time(tokens, now))
+
+    def _admit(self, tokens: float) -> None:
+        self.in_flight += 1
+        self._requests.take(1)
+        self._tokens.take(tokens)
+
+    def acquire(self, tokens: float, deadline: float, cancel_token=None) -> None:
+        """
+        Block until the call is admitted; TimeoutError once deadline (monotonic)
+        passes. A cancelled cancel_token (see orchestration.py) leaves the queue.
+        """
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, now)
+                    if wait <= 0:
+                        self._admit(tokens)
+                        return
+                    if now >= deadline:
+                        self._stats["queue_timeouts"] += 1
+                        raise TimeoutError(f"LLM call queued for more than {self.max_queue_seconds:.0f}s")
+                    # Poll cancellation at least every CANCEL_POLL_SECONDS
+                    self._cond.wait(min(wait, deadline - now, CANCEL_POLL_SECONDS))
+            finally:
+                self.waiting -= 1
+
+    def try_acquire(self, tokens: float) -> Optional[Callable[[bool], None]]:
+        """
+        Admit an optional extra call (a hedge) only if there is headroom right now
+        and nobody is queued. Returns its release(success) callback, or None.
+        """
+        with self._cond:
+            if self.waiting or self._wait_time(tokens, time.monotonic()) > 0:
+                return None
+            self._admit(tokens)
+        return self.release
+
+    def release(self, success: bool) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if success:
+                # Roughly +1 per limit's worth of successful calls
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Sync budgets with x-ratelimit-* headers from any response (200 or 429)."""
+        now = time.monotonic()
+
+        def number(name):
+            try:
+                return float(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        with self._cond:
+            self._requests.sync(number("x-ratelimit-limit-requests"), number("x-ratelimit-remaining-requests"), now)
+            self._tokens.sync(number("x-ratelimit-limit-tokens"), number("x-ratelimit-remaining-tokens"), now)
+            for kind in ("requests", "tokens"):
+                if number(f"x-ratelimit-remaining-{kind}") == 0:
+                    reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                    if reset:
+                        self._paused_until = max(self._paused_until, now + reset)
+            self._cond.notify_all()
+
+    def on_rate_limited(self, headers: Mapping[str, str]) -> None:
+        """A 429: halve the concurrency limit and pause admissions until retry-after."""
+        retry_after = parse_duration(headers.get("retry-after-ms"))
+        if retry_after is not None:
+            retry_after /= 1000
+        else:
+            retry_after = parse_duration(headers.get("retry-after"))
+        retry_after = retry_after or DEFAULT_RETRY_AFTER_SECONDS
+        with self._cond:
+            self._stats["rate_limited"] += 1
+            self.limit = max(LLM_MIN_CONCURRENCY, self.limit / 2)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self.observe(headers)
+
+    def settle_tokens(self, estimated: float, actual: Optional[float]) -> None:
+        """Return (or charge) the difference between the estimate and the reported usage."""
+        if actual is None:
+            return
+        with self._cond:
+            self._tokens.give_back(estimated - actual)
+            self._cond.notify_all()
+
+    def run(self, fn: Callable[[Callable[[], Callable[[bool], None]]], Any], tokens: float,
+            cancel_token=None) -> Any:
+        """
+        Run fn(admit), which performs one LLM call. fn must hold a slot for every
+        upstream request it makes, for as long as that request runs: admit()
+        blocks until one is granted and returns its release(success) callback.
+        429s are retried after back-off until the queue deadline, transient
+        errors TRANSIENT_RETRIES times.
+        """
+        import openai
+
+        deadline = time.monotonic() + self.max_queue_seconds
+        transient_left = TRANSIENT_RETRIES
+        with self._cond:
+            self._stats["calls"] += 1
+
+        def admit() -> Callable[[bool], None]:
+            self.acquire(tokens, deadline, cancel_token)
+            return self.release
+
+        while True:
+            try:
+                return fn(admit)
+            except openai.RateLimitError as e:
+                self.on_rate_limited(e.response.headers)
+                continue
+            except (openai.APIConnectionError, openai.InternalServerError):
+                if not transient_left or (cancel_token is not None and cancel_token.is_cancelled):
+                    raise
+                transient_left -= 1
+                with self._cond:
+                    self._stats["transient_retries"] += 1
+                time.sleep(0.5 * (TRANSIENT_RETRIES - transient_left))
+                continue
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(
+                self._stats,
+                concurrency_limit=round(self.limit, 2),
+                in_flight=self.in_flight,
+                waiting=self.waiting,
+            )
+
+
+def estimate_tokens(input_messages, max_output_tokens: int = 0) -> int:
+    """
+    Rough token cost of a Responses API call for the TPM budget: ~4 characters
+    per text token, ~765 tokens per image at up to 512px (4 tiles + base), plus
+    the output allowance.
+    """
+    tokens = max_output_tokens
+    for message in input_messages or []:
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += len(content) // 4
+            continue
+        for part in content or []:
+            if part.get("type") == "input_image":
+                tokens += 765
+            else:
+                tokens += len(part.get("text", "")) // 4
+    return tokens
+
+
+llm_governor = LLMGovernor()
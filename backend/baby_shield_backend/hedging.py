@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+from baby_shield_backend.orchestration import AgentCancelled
+
+
+# Hard timeout for a single LLM call, in seconds
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "60"))
+
+# Send a duplicate once a call is slower than this percentile of recent latencies
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "95"))
+
+# Hedges allowed per primary call (0.1 = at most ~10% extra calls)
+HEDGE_BUDGET = float(os.environ.get("HEDGE_BUDGET", "0.1"))
+
+# Bounds on the hedge deadline, and the deadline used until enough samples exist
+HEDGE_MIN_DELAY_SECONDS = float(os.environ.get("HEDGE_MIN_DELAY_SECONDS", "1"))
+HEDGE_INITIAL_DELAY_SECONDS = float(os.environ.get("HEDGE_INITIAL_DELAY_SECONDS", "15"))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+
+# Threads shared by all in-flight LLM calls and their hedges
+LLM_MAX_WORKERS = int(os.environ.get("LLM_MAX_WORKERS", "64"))
+
+
+class HedgePolicy:
+    """
+    Hedged requests for the agent LLM calls. Each agent keeps a rolling window of
+    its recent latencies; when a call runs past the configured percentile of that
+    window, a duplicate is sent and whichever answers first wins. Hedges draw
+    from a token bucket refilled by HEDGE_BUDGET per primary call, so a slow
+    upstream can't double the load. The losing call is not cancelled; it runs
+    out in the background (keeping its concurrency slot), bounded by the hard
+    timeout.
+    """
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, budget: float = HEDGE_BUDGET,
+                 timeout: float = LLM_TIMEOUT_SECONDS, max_workers: int = LLM_MAX_WORKERS):
+        self.percentile = percentile
+        self.budget = budget
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=HEDGE_WINDOW))
+        self._tokens = 1.0
+        self._stats = defaultdict(int)
+
+    def deadline(self, name: str) -> float:
+        """Seconds to wait on the primary call before hedging."""
+        with self._lock:
+            samples = sorted(self._latencies[name])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            delay = HEDGE_INITIAL_DELAY_SECONDS
+        else:
+            index = min(int(len(samples) * self.percentile / 100), len(samples) - 1)
+            delay = samples[index]
+        return min(max(delay, HEDGE_MIN_DELAY_SECONDS), self.timeout)
+
+    def _take_hedge_token(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+        self._count("hedges_denied")
+        return False
+
+    def _refund_hedge_token(self) -> None:
+        with self._lock:
+            self._tokens += 1
+
+    def _record(self, name: str, latency: float) -> None:
+        with self._lock:
+            self._latencies[name].append(latency)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def call(self, name: str, fn: Callable[[], Any],
+             slot: Optional[Callable[[], Callable[[bool], None]]] = None,
+             hedge_slot: Optional[Callable[[], Optional[Callable[[bool], None]]]] = None) -> Any:
+        """
+        Run fn (one LLM call), hedging it if it passes the adaptive deadline.
+        Every attempt holds a slot until its own request ends, even after another
+        attempt has won: slot, if given, blocks until the primary is admitted;
+        hedge_slot admits the duplicate only if there is headroom right now (e.g.
+        not while the provider is rate limiting us). Both return a
+        release(success) callback; hedge_slot returns None to refuse.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            self._tokens = min(self._tokens + self.budget, 1 + self.budget * 10)
+
+        # Time spent queueing for the primary's slot counts toward neither deadline
+        release_primary = slot() if slot else None
+        start = time.monotonic()
+
+        def timed(release):
+            # Every successful attempt, winner or loser, feeds the latency window
+            call_start = time.monotonic()
+            success = False
+            try:
+                result = fn()
+                success = True
+            finally:
+                if release is not None:
+                    release(success)
+            self._record(name, time.monotonic() - call_start)
+            return result
+
+        primary = self._executor.submit(timed, release_primary)
+        pending = {primary}
+        done, _ = wait(pending, timeout=self.deadline(name))
+
+        if not done and self._take_hedge_token():
+            release_hedge = hedge_slot() if hedge_slot else None
+            if hedge_slot and release_hedge is None:
+                self._refund_hedge_token()
+                self._count("hedges_denied")
+            else:
+                pending.add(self._executor.submit(timed, release_hedge))
+                self._count("hedges_sent")
+
+        error = None
+        while pending:
+            remaining = self.timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except AgentCancelled:
+                    # Dropped on purpose by the orchestrator (the hedge shares its token), not a failure
+                    self._count("cancelled")
+                    raise
+                except Exception as e:
+                    error = e
+                    continue
+                if future is not primary:
+                    self._count("hedge_wins")
+                return result
+
+        if error is not None:
+            self._count("errors")
+            raise error
+        self._count("timeouts")
+        raise TimeoutError(f"{name} did not answer within {self.timeout:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters, the hedge win rate (share of hedges that answered first) and
+        each agent's current hedge delay.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            names = list(self._latencies)
+        for key in ("calls", "hedges_sent", "hedge_wins", "hedges_denied", "errors", "timeouts", "cancelled"):
+            stats.setdefault(key, 0)
+        stats["hedge_win_rate"] = stats["hedge_wins"] / stats["hedges_sent"] if stats["hedges_sent"] else 0.0
+        stats["hedge_delays"] = {name: round(self.deadline(name), 3) for name in names}
+        return stats
+
+
+hedge_policy = HedgePolicy()
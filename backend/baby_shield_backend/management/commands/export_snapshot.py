@@ -0,0 +1,56 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def iter_verdicts(paths):
+    """(url, process_video result) for every successful record in warm_cache / VERDICT_LOG JSONL files."""
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partial last line from an interrupted writer
+                    continue
+                if record.get('ok') and record.get('result'):
+                    yield record['url'], record['result']
+
+
+class Command(BaseCommand):
+    help = (
+        "Build an immutable verdict snapshot from warm_cache results and VERDICT_LOG files. "
+        "Nodes memory-map it (VERDICT_SNAPSHOT_PATH) and answer from it before the live cache. "
+        "When a video appears more than once, the last record wins."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Snapshot file to write (replaced atomically)")
+        parser.add_argument('results', nargs='+', help="JSONL files with {url, ok, result} records, oldest first")
+
+    def handle(self, *args, **options):
+        from baby_shield_backend.snapshot import canonical_video_id, write_snapshot
+        from baby_shield_backend.views import build_response_data
+
+        for path in options['results']:
+            if not os.path.exists(path):
+                raise CommandError(f"Results file not found: {path}")
+
+        skipped = 0
+
+        def items():
+            nonlocal skipped
+            for url, result in iter_verdicts(options['results']):
+                try:
+                    body = build_response_data(result)
+                except (KeyError, TypeError):
+                    # Incomplete result (e.g. an ADK response missing an analysis)
+                    skipped += 1
+                    continue
+                yield canonical_video_id(url), json.dumps(body, separators=(',', ':')).encode()
+
+        count = write_snapshot(options['output'], items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} verdicts to {options['output']} ({skipped} incomplete results skipped)"
+        ))
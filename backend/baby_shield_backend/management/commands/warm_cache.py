@@ -0,0 +1,145 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.cache import cache as dj_cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _init_worker(llm_semaphore):
+    """Configure Django in the worker and route its LLM calls through the shared semaphore."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'baby_shield_backend.settings')
+    import django
+    django.setup()
+
+    from baby_shield_backend.ai import set_llm_semaphore
+    set_llm_semaphore(llm_semaphore)
+
+
+def _analyze(entry):
+    """Download (or use the local file) and analyze one manifest entry in a worker process."""
+    from baby_shield_backend.ai import process_video
+    from baby_shield_backend.views import download_video_from_url
+
+    if os.path.exists(entry):
+        file_path = entry
+    else:
+        file_path = download_video_from_url(entry)
+        if not file_path:
+            raise ValueError(f"Nothing downloaded for {entry}")
+    return process_video(file_path)
+
+
+def read_manifest(path):
+    """One URL or local file path per line; blank lines and # comments are skipped."""
+    with open(path) as f:
+        entries = [line.strip() for line in f]
+    entries = [entry for entry in entries if entry and not entry.startswith('#')]
+    # Keep manifest order but drop duplicates
+    return list(dict.fromkeys(entries))
+
+
+def read_completed(path):
+    """Entries that already have a successful result in a previous run's output."""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Partial last line from an interrupted run
+                continue
+            if record.get('ok'):
+                completed.add(record['url'])
+    return completed
+
+
+def terminate_partial_line(path):
+    """Append a newline if an interrupted run left a partial last line."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-analyze a manifest of video URLs or local files across a process pool and "
+        "write the results to the analysis cache and a JSONL file. Re-running with the "
+        "same output file resumes where the previous run stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest', help="File with one URL or local video path per line")
+        parser.add_argument('--output', default='warm_cache_results.jsonl',
+                            help="JSONL results file, also used to resume (default: %(default)s)")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Download/decode worker processes (default: %(default)s)")
+        parser.add_argument('--llm-concurrency', type=int, default=3,
+                            help="Max LLM calls in flight across all workers (default: %(default)s)")
+        parser.add_argument('--cache-timeout', type=int, default=3600,
+                            help="Cache timeout in seconds, 0 to never expire (default: %(default)s)")
+        parser.add_argument('--force', action='store_true',
+                            help="Re-analyze entries that are already cached or completed")
+
+    def handle(self, *args, **options):
+        from baby_shield_backend.views import analysis_cache_key
+
+        if not os.path.exists(options['manifest']):
+            raise CommandError(f"Manifest not found: {options['manifest']}")
+        if options['workers'] < 1 or options['llm_concurrency'] < 1:
+            raise CommandError("--workers and --llm-concurrency must be at least 1")
+
+        entries = read_manifest(options['manifest'])
+        output = options['output']
+        cache_timeout = options['cache_timeout'] or None
+
+        if not options['force']:
+            completed = read_completed(output)
+            entries = [
+                entry for entry in entries
+                if entry not in completed and dj_cache.get(analysis_cache_key(entry)) is None
+            ]
+
+        self.stdout.write(f"{len(entries)} entries to analyze with {options['workers']} workers")
+        if not entries:
+            return
+
+        terminate_partial_line(output)
+        context = multiprocessing.get_context()
+        llm_semaphore = context.BoundedSemaphore(options['llm_concurrency'])
+        succeeded = failed = 0
+
+        with open(output, 'a') as out, ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(llm_semaphore,),
+        ) as executor:
+            futures = {executor.submit(_analyze, entry): entry for entry in entries}
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    data = future.result()
+                    if data.get('error'):
+                        raise RuntimeError(data.get('error_message'))
+                except Exception as e:
+                    failed += 1
+                    record = {'url': entry, 'ok': False, 'error': str(e)}
+                    self.stderr.write(f"FAILED {entry}: {e}")
+                else:
+                    succeeded += 1
+                    dj_cache.set(analysis_cache_key(entry), data, timeout=cache_timeout)
+                    record = {'url': entry, 'ok': True, 'result': data}
+                    self.stdout.write(f"OK {entry}")
+
+                # Flush each record so an interrupted run can resume from the file
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {succeeded} analyzed, {failed} failed"))
@@ -0,0 +1,146 @@
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+
+
+# Cancel outstanding agent calls once a decision rule settles the outcome
+EARLY_CANCELLATION = os.environ.get("EARLY_CANCELLATION", "1") == "1"
+
+
+class AgentCancelled(Exception):
+    """Raised inside an agent call that was cancelled by the orchestrator."""
+
+
+class CancelToken:
+    """
+    Cancellation flag for one agent call. Open resources (e.g. an in-flight
+    HTTP stream) register a close callback so cancel() interrupts them
+    immediately instead of waiting for the next check.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error while cancelling agent call: {e}")
+
+    def register(self, callback: Callable[[], None]) -> None:
+        """Run callback on cancel (right away if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def unregister(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self) -> None:
+        if self.is_cancelled:
+            raise AgentCancelled()
+
+
+@dataclass
+class DecisionRule:
+    """Once `trigger` returns a result matching `predicate`, the `cancels` tasks are no longer needed."""
+    name: str
+    trigger: str
+    predicate: Callable[[Dict[str, Any]], bool]
+    cancels: List[str] = field(default_factory=list)
+    reason: str = ""
+
+
+DECISION_RULES = [
+    DecisionRule(
+        name="unsafe_content",
+        trigger="content_safety_analysis",
+        predicate=lambda result: bool(result.get("contains_inappropriate_content")),
+        cancels=["playback_speed_analysis", "color_contrast_analysis"],
+        reason="Skipped: content was flagged as inappropriate, the video gets a warning instead.",
+    ),
+]
+
+# Neutral stand-ins for skipped analyses so consumers that index these keys keep working
+SKIPPED_DEFAULTS = {
+    "playback_speed_analysis": {"needs_slower_playback": False, "recommended_factor": 1.0},
+    "color_contrast_analysis": {"needs_reduced_contrast": False},
+}
+
+
+def skipped_result(task: str, reason: str) -> Dict[str, Any]:
+    return dict(SKIPPED_DEFAULTS.get(task, {}), skipped=True, skip_reason=reason)
+
+
+def run_tasks(tasks: Dict[str, Callable[[CancelToken], Any]],
+              rules: List[DecisionRule] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Run tasks concurrently, each with its own CancelToken. Whenever a task
+    finishes, matching decision rules cancel the tasks they make redundant:
+    queued ones never start, running ones are interrupted through their token.
+    Returns (results by task name, names of skipped tasks). Skipped tasks get a
+    skipped_result() marker; errors from the others propagate as before.
+    """
+    if rules is None:
+        rules = DECISION_RULES if EARLY_CANCELLATION else []
+
+    tokens = {name: CancelToken() for name in tasks}
+    skipped = {}
+    executor = ThreadPoolExecutor(max_workers=len(tasks))
+    try:
+        by_name = {name: executor.submit(fn, tokens[name]) for name, fn in tasks.items()}
+        names = {future: name for name, future in by_name.items()}
+        pending = set(by_name.values())
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = names[future]
+                if name in skipped or future.exception() is not None:
+                    continue
+                result = future.result()
+                for rule in rules:
+                    if rule.trigger != name or not rule.predicate(result):
+                        continue
+                    for target in rule.cancels:
+                        target_future = by_name.get(target)
+                        if target_future is None or target in skipped or target_future.done():
+                            continue
+                        print(f"Decision rule {rule.name}: cancelling {target}")
+                        skipped[target] = rule.reason
+                        target_future.cancel()
+                        tokens[target].cancel()
+                        # Don't wait for the interrupted call to unwind
+                        pending.discard(target_future)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results = {}
+    for name, future in by_name.items():
+        if name not in skipped:
+            results[name] = future.result()
+        elif future.done() and not future.cancelled() and future.exception() is None:
+            # Finished just before it could be cancelled; keep the real answer
+            results[name] = future.result()
+            del skipped[name]
+        else:
+            results[name] = skipped_result(name, skipped[name])
+    return results, list(skipped)
@@ -0,0 +1,167 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from functools import cache
+from typing import Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+
+# Immutable verdict snapshot shipped to every node. Layout (little-endian):
+#
+#   header   magic, version, record count, slot count (power of two)
+#   slots    slot_count x (key hash u64, record offset u64); offset 0 = empty
+#   records  key length u16, value length u32, key bytes, value bytes
+#
+# The slots form an open-addressing hash table (linear probing, load <= 0.5)
+# keyed by a stable 64-bit blake2b hash of the canonical video ID. Values are
+# the ready-to-send JSON bodies of the API response, so a hit needs no parsing.
+MAGIC = b"BSVSNAP1"
+VERSION = 1
+HEADER = struct.Struct("<8sIII4x")
+SLOT = struct.Struct("<QQ")
+RECORD = struct.Struct("<HI")
+
+# Path of the snapshot to memory-map; unset disables the snapshot tier
+VERDICT_SNAPSHOT_PATH = os.environ.get("VERDICT_SNAPSHOT_PATH")
+
+YOUTUBE_HOSTS = {"youtube.com", "youtu.be", "youtube-nocookie.com"}
+
+
+def canonical_video_id(url: str) -> str:
+    """
+    Stable ID for a video URL so different spellings share one verdict:
+    "youtube:<id>" for YouTube, otherwise host + path + sorted query without
+    tracking parameters. Anything that isn't an http(s) URL is returned as is.
+    """
+    parts = urlsplit(url.strip())
+    if parts.scheme not in ("http", "https"):
+        return url.strip()
+
+    host = parts.hostname or ""
+    for prefix in ("www.", "m.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = parts.path.rstrip("/")
+    query = parse_qsl(parts.query)
+
+    if host in YOUTUBE_HOSTS:
+        video_id = None
+        if host == "youtu.be":
+            video_id = path.lstrip("/")
+        elif path == "/watch":
+            video_id = dict(query).get("v")
+        else:
+            segments = path.split("/")
+            if len(segments) >= 3 and segments[1] in ("shorts", "embed", "live", "v"):
+                video_id = segments[2]
+        if video_id:
+            return f"youtube:{video_id}"
+
+    query = sorted((k, v) for k, v in query if not k.startswith("utm_") and k not in ("si", "feature"))
+    return f"{host}{path}" + (f"?{urlencode(query)}" if query else "")
+
+
+def key_hash(key: bytes) -> int:
+    # Never 0, so a zeroed slot is unambiguous even before checking the offset
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") or 1
+
+
+def write_snapshot(path: str, items: Iterable[Tuple[str, bytes]]) -> int:
+    """
+    Write (video ID, JSON body) pairs to a new snapshot at path, atomically
+    replacing any existing file. Later duplicates win. Returns the record count.
+    """
+    records = {}
+    for video_id, value in items:
+        records[video_id.encode()] = value
+
+    slot_count = 1
+    while slot_count < max(len(records) * 2, 1):
+        slot_count *= 2
+    mask = slot_count - 1
+
+    slots = [(0, 0)] * slot_count
+    body = bytearray()
+    records_start = HEADER.size + SLOT.size * slot_count
+    for key, value in records.items():
+        h = key_hash(key)
+        i = h & mask
+        while slots[i][1]:
+            i = (i + 1) & mask
+        slots[i] = (h, records_start + len(body))
+        body += RECORD.pack(len(key), len(value)) + key + value
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+        try:
+            f.write(HEADER.pack(MAGIC, VERSION, len(records), slot_count))
+            for slot in slots:
+                f.write(SLOT.pack(*slot))
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+            # The temp file is 0600; nodes may run the server under another uid
+            os.fchmod(f.fileno(), 0o644 & ~current_umask())
+        except BaseException:
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+    return len(records)
+
+
+def current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+class VerdictSnapshot:
+    """Read-only, memory-mapped view of a snapshot file; O(1) lookups, no deserialization."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.slot_count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"Not a verdict snapshot (v{VERSION}): {path}")
+        self._mask = self.slot_count - 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, video_id: str) -> Optional[bytes]:
+        """JSON body stored for video_id, or None."""
+        key = video_id.encode()
+        h = key_hash(key)
+        i = h & self._mask
+        while True:
+            slot_hash, offset = SLOT.unpack_from(self._mm, HEADER.size + i * SLOT.size)
+            if not offset:
+                return None
+            if slot_hash == h:
+                key_len, value_len = RECORD.unpack_from(self._mm, offset)
+                key_start = offset + RECORD.size
+                if self._mm[key_start:key_start + key_len] == key:
+                    value_start = key_start + key_len
+                    return self._mm[value_start:value_start + value_len]
+            i = (i + 1) & self._mask
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+@cache
+def get_verdict_snapshot() -> Optional[VerdictSnapshot]:
+    """The node's snapshot, mapped once per process; None if not configured or unreadable."""
+    if not VERDICT_SNAPSHOT_PATH:
+        return None
+    try:
+        snapshot = VerdictSnapshot(VERDICT_SNAPSHOT_PATH)
+    except (OSError, ValueError) as e:
+        print(f"Verdict snapshot unavailable: {e}")
+        return None
+    print(f"Loaded verdict snapshot with {len(snapshot)} verdicts from {VERDICT_SNAPSHOT_PATH}")
+    return snapshot
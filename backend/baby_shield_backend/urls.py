@@ -21,4 +21,5 @@ from . import views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/download-video/', views.download_video, name='download_video'),
+    path('api/llm-stats/', views.llm_stats, name='llm_stats'),
 ]
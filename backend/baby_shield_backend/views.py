@@ -1,20 +1,71 @@
+import hashlib
 import json
 import os
 import tempfile
-import yt_dlp
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 
 from baby_shield_backend.ai import process_video
+from baby_shield_backend.governor import llm_governor
+from baby_shield_backend.hedging import hedge_policy
+from baby_shield_backend.snapshot import canonical_video_id, get_verdict_snapshot
 
 from functools import cache
 
 from django.core.cache import cache as dj_cache
 
+def analysis_cache_key(url):
+    return f"download_video:{url}"
+
+def build_response_data(data):
+    """Map a process_video result onto the actions the extension applies."""
+    # ### reduceSpeed: bool (if true, fractor given in speedFactor)
+    # ### applyFilters: list of filters to apply ('tone-down', 'blur', 'grayscale') or empty
+    # ### showWarning: bool (if true, warningMessage to be shown)
+    # ### capVolume: bool (if true, cap volume at volumeLevel, 0-1)
+    return {
+        'reduceSpeed': data['playback_speed_analysis']['needs_slower_playback'],
+        'speedFactor': data['playback_speed_analysis']['recommended_factor'],
+        # 'applyFilters':  ['tone-down'] if data['color_contrast_analysis'].get('needs_reduced_contrast')  else [],
+        'applyFilters':  ['tone-down'] if data['color_contrast_analysis']['needs_reduced_contrast'] else [],
+        'showWarning': data['content_safety_analysis']['contains_inappropriate_content'],
+        'warningMessage': data['content_safety_analysis']['safety_message'] if data['content_safety_analysis']['contains_inappropriate_content'] else '',
+        # Older cached verdicts predate the audio analysis
+        'capVolume': data.get('audio_loudness_analysis', {}).get('needs_volume_cap', False),
+        'volumeLevel': data.get('audio_loudness_analysis', {}).get('recommended_volume', 1.0),
+        # Analyses cancelled early because the verdict was already decided
+        'skippedAnalyses': data.get('skipped_analyses', []),
+        # 'showWarning': True,
+        # 'warningMessage': 'This video contains fast movements that may be harmful to babies.',
+    }
+
+def log_verdict(url, data):
+    """Append a fresh verdict to VERDICT_LOG (same JSONL format as warm_cache) for export_snapshot."""
+    log_path = os.environ.get('VERDICT_LOG')
+    if not log_path:
+        return
+    with open(log_path, 'a') as f:
+        f.write(json.dumps({'url': url, 'ok': True, 'result': data}) + '\n')
+
+def fixture_video_for_url(url, fixture_dir):
+    """Deterministically map a URL onto one of the local fixture videos (load testing)."""
+    fixtures = sorted(os.listdir(fixture_dir))
+    if not fixtures:
+        return None
+    index = int(hashlib.sha1(url.encode()).hexdigest(), 16) % len(fixtures)
+    return os.path.join(fixture_dir, fixtures[index])
+
 @cache
 def download_video_from_url(url):
+    # Serve local fixtures instead of hitting the network (see benchmarks/loadtest.py)
+    fixture_dir = os.environ.get('VIDEO_FIXTURE_DIR')
+    if fixture_dir:
+        return fixture_video_for_url(url, fixture_dir)
+
+    # yt_dlp is slow to import; keep it off the URLconf import path
+    import yt_dlp
 
     # Create temporary directory
     with tempfile.TemporaryDirectory(delete=False) as temp_dir:
@@ -58,32 +109,31 @@ def download_video(request):
                 'error': 'URL is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        cache_key = f"download_video:{url}"
+        # Fleet-wide snapshot first: a memory-mapped, ready-to-send JSON body
+        snapshot = get_verdict_snapshot()
+        if snapshot is not None:
+            body = snapshot.get(canonical_video_id(url))
+            if body is not None:
+                return HttpResponse(body, content_type='application/json', headers={'X-Cache': 'SNAPSHOT'})
+
+        cache_key = analysis_cache_key(url)
 
         cached_response = dj_cache.get(cache_key)
-        if cached_response:
+        cache_hit = bool(cached_response)
+        if cache_hit:
             data = cached_response
         else:
             file_path = download_video_from_url(url)
 
             data = process_video(file_path)
 
-            dj_cache.set(cache_key, data, timeout=3600)
+            # Don't pin a failed analysis in the cache for an hour
+            if not data.get('error'):
+                dj_cache.set(cache_key, data, timeout=3600)
+                log_verdict(url, data)
 
-            # ### reduceSpeed: bool (if true, fractor given in speedFactor)
-            # ### applyFilters: list of filters to apply ('tone-down', 'blur', 'grayscale') or empty
-            # ### showWarning: bool (if true, warningMessage to be shown)
         print(json.dumps(data, indent=4))
-        response_data = {
-            'reduceSpeed': data['playback_speed_analysis']['needs_slower_playback'],
-            'speedFactor': data['playback_speed_analysis']['recommended_factor'],
-            # 'applyFilters':  ['tone-down'] if data['color_contrast_analysis'].get('needs_reduced_contrast')  else [],
-            'applyFilters':  ['tone-down'] if data['color_contrast_analysis']['needs_reduced_contrast'] else [],
-            'showWarning': data['content_safety_analysis']['contains_inappropriate_content'],
-            'warningMessage': data['content_safety_analysis']['safety_message'] if data['content_safety_analysis']['contains_inappropriate_content'] else '',
-            # 'showWarning': True,
-            # 'warningMessage': 'This video contains fast movements that may be harmful to babies.',
-        }
+        response_data = build_response_data(data)
 
             # response_data = {
             #     'reduceSpeed': False,
@@ -97,10 +147,24 @@ def download_video(request):
             # }
 
             # Files are automatically cleaned up when temp directory context exits
-        return Response(response_data, status=status.HTTP_200_OK)
+        return Response(response_data, status=status.HTTP_200_OK,
+                        headers={'X-Cache': 'HIT' if cache_hit else 'MISS'})
     except Exception as e:
         import traceback
         traceback.print_exc()
         return Response({
             'error': f'An unexpected error occurred: {str(e)}'
-        }, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+def llm_stats(request):
+    """
+    Process-wide LLM call metrics since startup: hedging (hedges sent, hedge
+    win rate, per-agent latency deadlines) and the governor (429s, retries,
+    queue timeouts, current concurrency limit).
+    """
+    return Response({
+        'hedging': hedge_policy.stats(),
+        'governor': llm_governor.stats(),
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,281 @@
+"""
+Local stand-ins for the paid/remote upstreams, for load testing:
+
+- a fake OpenAI Responses API (POST /v1/responses), used through OPENAI_BASE_URL
+- a fake ADK service (session creation + POST /run_sse), used through BASE_ADK_URL
+
+Latency is drawn from a log-normal distribution (median + sigma), a configurable
+fraction of calls fail with a 500 (or 429), and a configurable fraction of
+analyses flag the content as inappropriate.
+
+Standalone usage (from backend/):
+    python benchmarks/fake_upstreams.py --port 8900 --median-ms 1500 --sigma 0.5
+"""
+import argparse
+import json
+import math
+import random
+import select
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class FakeUpstreamConfig:
+    median_ms: float = 1500.0
+    sigma: float = 0.5
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    unsafe_rate: float = 0.1
+    seed: Optional[int] = None
+    # Gap between streamed text deltas (a model "thinking" sends nothing for a while)
+    stream_delta_ms: float = 50.0
+
+
+def playback_result(unsafe):
+    return {
+        "needs_slower_playback": unsafe,
+        "recommended_factor": 0.75 if unsafe else 1.0,
+        "reasoning": "Synthetic result from the fake upstream",
+    }
+
+
+def contrast_result(unsafe):
+    return {
+        "needs_reduced_contrast": unsafe,
+        "reasoning": "Synthetic result from the fake upstream",
+        "specific_concerns": [],
+    }
+
+
+def safety_result(unsafe):
+    return {
+        "contains_inappropriate_content": unsafe,
+        "safety_message": "Synthetic unsafe verdict" if unsafe else "Synthetic safe verdict",
+        "content_issues": ["synthetic"] if unsafe else [],
+        "recommended_age": "3 years" if unsafe else "0 months",
+    }
+
+
+def agent_result(instructions, unsafe):
+    """Pick the canned payload matching the agent's system prompt."""
+    if "playback speed" in instructions:
+        return playback_result(unsafe)
+    if "color contrast" in instructions:
+        return contrast_result(unsafe)
+    return safety_result(unsafe)
+
+
+def responses_body(text, model):
+    """Minimal OpenAI Responses API object with one output_text message."""
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": model,
+        "output": [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex}",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+    }
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self) -> FakeUpstreamConfig:
+        return self.server.config
+
+    def send_json(self, status, body, content_type="application/json"):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_events(self, events):
+        """Server-sent events, flushed one by one so the client sees each as it happens."""
+        for event in events:
+            self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+
+    def client_gone(self, timeout):
+        """Wait up to timeout; True if the client closed the connection meanwhile."""
+        readable, _, _ = select.select([self.connection], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            gone = not self.connection.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+        if not gone:
+            # Unexpected extra bytes from the client; just wait out the delay
+            time.sleep(timeout)
+        return gone
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def sample_upstream(self):
+        """Sampled (latency seconds, error status or None, unsafe verdict) for one call."""
+        rng = self.server.rng
+        with self.server.rng_lock:
+            latency = self.config.median_ms * math.exp(rng.gauss(0, self.config.sigma)) / 1000
+            roll = rng.random()
+            unsafe = rng.random() < self.config.unsafe_rate
+        if roll < self.config.rate_limit_rate:
+            return latency, 429, unsafe
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            return latency, 500, unsafe
+        return latency, None, unsafe
+
+    def simulate_upstream(self):
+        """Sleep for a sampled latency; returns (error status or None, unsafe verdict)."""
+        latency, error, unsafe = self.sample_upstream()
+        time.sleep(latency)
+        return error, unsafe
+
+    def do_POST(self):
+        body = self.read_json()
+
+        if self.path.rstrip("/").endswith("/responses") and body.get("stream"):
+            # Like the real API: errors are plain HTTP errors, otherwise headers and
+            # response.created go out right away, then text deltas spread over the
+            # latency. A client hanging up is noticed at once, as a real server would
+            latency, error, unsafe = self.sample_upstream()
+            if error:
+                time.sleep(latency)
+                return self.send_json(error, {"error": {"message": "fake upstream error", "type": "server_error"}})
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            text = json.dumps(agent_result(body.get("instructions", ""), unsafe))
+            response = responses_body(text, body.get("model", "fake"))
+            item_id = response["output"][0]["id"]
+            deltas = max(int(latency * 1000 / self.config.stream_delta_ms), 1)
+            step = -(-len(text) // deltas)
+            try:
+                self.send_events([{"type": "response.created", "sequence_number": 0,
+                                   "response": dict(response, status="in_progress", output=[])}])
+                for i in range(deltas):
+                    if self.client_gone(latency / deltas):
+                        raise ConnectionResetError()
+                    self.send_events([{
+                        "type": "response.output_text.delta", "sequence_number": i + 1,
+                        "item_id": item_id, "output_index": 0, "content_index": 0,
+                        "delta": text[i * step:(i + 1) * step], "logprobs": [],
+                    }])
+                self.send_events([{"type": "response.completed", "sequence_number": deltas + 1,
+                                   "response": response}])
+            except (BrokenPipeError, ConnectionResetError):
+                # The client cancelled the call; stop "generating"
+                with self.server.rng_lock:
+                    self.server.disconnects.append(time.monotonic())
+            return
+
+        if self.path.rstrip("/").endswith("/responses"):
+            error, unsafe = self.simulate_upstream()
+            if error:
+                return self.send_json(error, {"error": {"message": "fake upstream error", "type": "server_error"}})
+            text = json.dumps(agent_result(body.get("instructions", ""), unsafe))
+            return self.send_json(200, responses_body(text, body.get("model", "fake")))
+
+        if self.path.startswith("/apps/"):
+            # ADK session creation
+            return self.send_json(200, {"id": "fake-session", "appName": body.get("app_name"), "state": {}})
+
+        if self.path == "/run_sse":
+            error, unsafe = self.simulate_upstream()
+            if error:
+                return self.send_json(error, {"error": "fake upstream error"})
+            merged = {
+                "playback_speed_analysis": playback_result(unsafe),
+                "color_contrast_analysis": contrast_result(unsafe),
+                "content_safety_analysis": safety_result(unsafe),
+                "overall_recommendation": {
+                    "safe_for_babies": not unsafe,
+                    "requires_modifications": unsafe,
+                    "summary": "Synthetic merged result",
+                },
+            }
+            event = {"content": {"parts": [{"text": json.dumps(merged)}], "role": "model"}}
+            return self.send_json(200, f"data: {json.dumps(event)}\n\n".encode(), "text/event-stream")
+
+        self.send_json(404, {"error": f"unknown path {self.path}"})
+
+
+def start_fake_upstreams(config: FakeUpstreamConfig, host="127.0.0.1", port=0) -> ThreadingHTTPServer:
+    """Start the fake server on a daemon thread; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), FakeUpstreamHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.rng = random.Random(config.seed)
+    server.rng_lock = threading.Lock()
+    # monotonic() of every streamed call the client hung up on
+    server.disconnects = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--median-ms", type=float, default=1500.0, help="Median upstream latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Log-normal sigma of upstream latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction failing with 429")
+    parser.add_argument("--unsafe-rate", type=float, default=0.1, help="Fraction of analyses flagged unsafe")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--stream-delta-ms", type=float, default=50.0, help="Gap between streamed text deltas")
+
+
+def config_from_args(args) -> FakeUpstreamConfig:
+    return FakeUpstreamConfig(
+        median_ms=args.median_ms,
+        sigma=args.sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        unsafe_rate=args.unsafe_rate,
+        seed=args.seed,
+        stream_delta_ms=args.stream_delta_ms,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_fake_upstreams(config_from_args(args), args.host, args.port)
+    host, port = server.server_address
+    print(f"OPENAI_BASE_URL=http://{host}:{port}/v1")
+    print(f"BASE_ADK_URL=http://{host}:{port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to set up Django and load
+the URLconf (which imports views.py and ai.py), i.e. the cost every manage.py
+command and worker boot pays.
+
+Usage (from backend/):
+    python benchmarks/import_time.py [--runs 10] [--warm-up] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter; prints setup and URLconf load time in seconds
+CHILD = """
+import os, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'baby_shield_backend.settings')
+start = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+import baby_shield_backend.urls
+urls_done = time.perf_counter()
+if {warm_up}:
+    from baby_shield_backend.ai import warm_up
+    warm_up()
+print(setup_done - start, urls_done - setup_done, time.perf_counter() - urls_done)
+"""
+
+
+def run_once(warm_up: bool):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(warm_up=warm_up)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return [float(x) for x in out.stdout.split()[-3:]]
+
+
+def top_imports(top: int):
+    """Slowest modules (cumulative) when loading the URLconf, from python -X importtime."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(warm_up=False)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), match.group(4).strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warm-up", action="store_true", help="Also time ai.warm_up() after the URLconf load")
+    parser.add_argument("--top", type=int, default=15, help="Show the N slowest imports (0 to skip)")
+    args = parser.parse_args()
+
+    samples = [run_once(args.warm_up) for _ in range(args.runs)]
+    for label, values in zip(("django.setup()", "URLconf import", "warm_up()"), zip(*samples)):
+        if label == "warm_up()" and not args.warm_up:
+            continue
+        ms = [v * 1000 for v in values]
+        print(f"{label:16} median {statistics.median(ms):8.1f} ms   min {min(ms):8.1f} ms   max {max(ms):8.1f} ms")
+
+    if args.top:
+        print("\nSlowest imports (cumulative):")
+        for micros, module in top_imports(args.top):
+            print(f"  {micros / 1000:8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+End-to-end load test of POST /api/download-video/ without OpenAI, the Cloud Run
+ADK service or yt-dlp:
+
+- fake upstreams (benchmarks/fake_upstreams.py) stand in for OpenAI and ADK
+- generated fixture videos stand in for downloads (VIDEO_FIXTURE_DIR)
+- each path (direct agents, ADK) gets its own runserver with a fresh cache
+
+Reports throughput, p50/p95/p99 latency, errors, cache hit rate and upstream
+calls cancelled mid-stream per path.
+
+Usage (from backend/):
+    python benchmarks/loadtest.py --requests 200 --concurrency 16 --unique-urls 40
+    python benchmarks/loadtest.py --paths direct --median-ms 800 --sigma 0.8 --error-rate 0.02
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_upstreams import add_config_arguments, config_from_args, start_fake_upstreams
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from baby_shield_backend.decoders import find_ffmpeg  # noqa: E402
+
+# (name, size) of the generated fixture clips
+FIXTURE_SIZES = [("720p", "1280x720"), ("1080p", "1920x1080")]
+
+
+def make_fixtures(fixture_dir, seconds):
+    """Generate short synthetic clips (moving test pattern + tone) with ffmpeg."""
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        raise SystemExit("ffmpeg is needed to generate fixtures (or pass --fixtures DIR)")
+    for name, size in FIXTURE_SIZES:
+        subprocess.run([
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+            "-t", str(seconds), "-pix_fmt", "yuv420p", "-shortest",
+            os.path.join(fixture_dir, f"fixture_{name}.mp4"),
+        ], check=True)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit("Backend server exited during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"Backend server did not start on port {port}")
+
+
+def start_backend(port, upstream_url, fixture_dir, use_adk, cache_dir):
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=f"{upstream_url}/v1",
+        OPENAI_API_KEY="fake-key",
+        BASE_ADK_URL=upstream_url,
+        USE_ADK="1" if use_adk else "0",
+        VIDEO_FIXTURE_DIR=fixture_dir,
+    )
+    # The file cache LOCATION is relative, so running from cache_dir isolates each run's cache
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "manage.py"), "runserver", "--noreload", f"127.0.0.1:{port}"],
+        cwd=cache_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_for_port(port, proc)
+    return proc
+
+
+def send_request(endpoint, url, timeout):
+    """One client request; returns (latency seconds, HTTP status or None, X-Cache header)."""
+    request = urllib.request.Request(
+        endpoint, data=json.dumps({"url": url}).encode(), headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return time.perf_counter() - start, response.status, response.headers.get("X-Cache")
+    except urllib.error.HTTPError as e:
+        return time.perf_counter() - start, e.code, None
+    except OSError:
+        return time.perf_counter() - start, None, None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_load(endpoint, args, rng):
+    urls = [f"https://fixtures.local/video/{i}" for i in range(args.unique_urls)]
+    picks = [rng.choice(urls) for _ in range(args.requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda url: send_request(endpoint, url, args.timeout), picks))
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r[1] == 200]
+    latencies = sorted(r[0] for r in ok)
+    hits = sum(1 for r in ok if r[2] in ("HIT", "SNAPSHOT"))
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "cache_hit_rate": hits / len(ok) if ok else 0.0,
+    }
+
+
+def print_report(path, report):
+    print(
+        f"{path:7} {report['requests']:6d} req  {report['errors']:4d} err  "
+        f"{report['throughput_rps']:7.2f} req/s  "
+        f"p50 {report['p50_ms']:8.1f} ms  p95 {report['p95_ms']:8.1f} ms  p99 {report['p99_ms']:8.1f} ms  "
+        f"hit rate {report['cache_hit_rate']:5.1%}  "
+        f"cancelled {report.get('upstream_cancelled', 0):4d}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", nargs="+", choices=["direct", "adk"], default=["direct", "adk"])
+    parser.add_argument("--requests", type=int, default=100, help="Total client requests per path")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--unique-urls", type=int, default=20, help="Distinct URLs the clients draw from")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Client timeout per request (s)")
+    parser.add_argument("--fixtures", help="Directory of fixture videos (generated if omitted)")
+    parser.add_argument("--fixture-seconds", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print reports as JSON")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    upstream = start_fake_upstreams(config_from_args(args))
+    upstream_url = "http://%s:%d" % upstream.server_address
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        fixture_dir = args.fixtures
+        if not fixture_dir:
+            fixture_dir = os.path.join(work_dir, "fixtures")
+            os.mkdir(fixture_dir)
+            make_fixtures(fixture_dir, args.fixture_seconds)
+
+        reports = {}
+        for path in args.paths:
+            cache_dir = os.path.join(work_dir, f"cache_{path}")
+            os.mkdir(cache_dir)
+            port = free_port()
+            proc = start_backend(port, upstream_url, fixture_dir, path == "adk", cache_dir)
+            disconnects = len(upstream.disconnects)
+            try:
+                reports[path] = run_load(f"http://127.0.0.1:{port}/api/download-video/", args, rng)
+                # Agent calls the backend cancelled mid-stream (early cancellation)
+                reports[path]["upstream_cancelled"] = len(upstream.disconnects) - disconnects
+            finally:
+                proc.terminate()
+                proc.wait()
+
+    upstream.shutdown()
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for path, report in reports.items():
+            print_report(path, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import unittest
+
+import numpy as np
+
+from baby_shield_backend.audio import LoudnessAnalyzer
+from baby_shield_backend.decoders import AUDIO_SAMPLE_RATE
+
+
+def tone(seconds, amplitude, frequency=440.0):
+    t = np.arange(int(seconds * AUDIO_SAMPLE_RATE)) / AUDIO_SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * frequency * t)
+
+
+def analyze(signal):
+    """Feed float samples in [-1, 1] as int16, one second per chunk like analyze_audio."""
+    analyzer = LoudnessAnalyzer()
+    pcm = np.clip(signal * 32767, -32768, 32767).astype(np.int16)
+    for start in range(0, pcm.size, AUDIO_SAMPLE_RATE):
+        analyzer.feed(pcm[start:start + AUDIO_SAMPLE_RATE])
+    return analyzer.result()
+
+
+class LoudnessAnalyzerTests(unittest.TestCase):
+    def test_no_audio(self):
+        result = LoudnessAnalyzer().result()
+        self.assertFalse(result["audio_available"])
+        self.assertFalse(result["needs_volume_cap"])
+
+    def test_loud_five_second_clip_is_sustained(self):
+        # Downloads are cut to 5 s; a loud tone throughout must still count as sustained
+        result = analyze(tone(5, 0.5))
+        self.assertTrue(result["is_sustained_loud"])
+        self.assertTrue(result["needs_volume_cap"])
+        self.assertLess(result["recommended_volume"], 1.0)
+
+    def test_moderate_clip_is_left_alone(self):
+        result = analyze(tone(5, 0.05))
+        self.assertFalse(result["is_sustained_loud"])
+        self.assertFalse(result["needs_volume_cap"])
+        self.assertEqual(result["recommended_volume"], 1.0)
+
+    def test_bang_in_first_second(self):
+        signal = np.concatenate((np.zeros(int(0.5 * AUDIO_SAMPLE_RATE)), tone(0.2, 0.9), np.zeros(AUDIO_SAMPLE_RATE * 4)))
+        result = analyze(signal)
+        self.assertTrue(result["has_startle_sounds"])
+        self.assertEqual(result["startle_events"][0]["time_seconds"], 0.5)
+        self.assertFalse(result["is_sustained_loud"])
+        self.assertTrue(result["needs_volume_cap"])
+
+    def test_loud_opening_is_not_a_startle(self):
+        # Nothing quiet was heard before it, so there is no jump to startle at
+        signal = np.concatenate((tone(0.3, 0.9), np.zeros(AUDIO_SAMPLE_RATE * 4)))
+        result = analyze(signal)
+        self.assertEqual(result["startle_events"], [])
+
+    def test_bang_after_short_quiet_lead_in(self):
+        signal = np.concatenate((tone(0.3, 0.001), tone(0.2, 0.9), tone(4.5, 0.001)))
+        result = analyze(signal)
+        self.assertEqual(result["startle_events"][0]["time_seconds"], 0.3)
+
+    def test_steady_normal_level_clip_is_not_capped(self):
+        # About -17.7 and -14.8 LUFS: above the momentary cap target, below sustained-loud
+        for amplitude in (0.2, 0.28):
+            result = analyze(tone(5, amplitude))
+            self.assertFalse(result["has_startle_sounds"], amplitude)
+            self.assertFalse(result["is_sustained_loud"], amplitude)
+            self.assertFalse(result["needs_volume_cap"], amplitude)
+            self.assertEqual(result["recommended_volume"], 1.0)
+
+    def test_quiet_startle_needs_no_cap(self):
+        # A big jump from near silence that stays under the target level
+        signal = np.concatenate((tone(2, 0.001), tone(0.2, 0.1), tone(2.8, 0.001)))
+        result = analyze(signal)
+        self.assertTrue(result["has_startle_sounds"])
+        self.assertFalse(result["needs_volume_cap"])
+        self.assertEqual(result["recommended_volume"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+from openai import OpenAI
+
+from baby_shield_backend import ai
+from baby_shield_backend.orchestration import AgentCancelled, CancelToken, DecisionRule, run_tasks
+from benchmarks.fake_upstreams import FakeUpstreamConfig, start_fake_upstreams
+
+
+UNSAFE_RULE = DecisionRule(
+    name="unsafe",
+    trigger="safety",
+    predicate=lambda result: result["unsafe"],
+    cancels=["speed"],
+    reason="not needed",
+)
+
+
+class RunTasksTests(unittest.TestCase):
+    def test_rule_cancels_running_task(self):
+        cancelled = threading.Event()
+
+        def speed(token):
+            token.register(cancelled.set)
+            cancelled.wait(5)
+            token.raise_if_cancelled()
+            return "slow result"
+
+        start = time.monotonic()
+        results, skipped = run_tasks({"speed": speed, "safety": lambda token: {"unsafe": True}}, [UNSAFE_RULE])
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(skipped, ["speed"])
+        self.assertTrue(results["speed"]["skipped"])
+        self.assertEqual(results["speed"]["skip_reason"], "not needed")
+
+    def test_rule_not_matching(self):
+        results, skipped = run_tasks(
+            {"speed": lambda token: "done", "safety": lambda token: {"unsafe": False}}, [UNSAFE_RULE])
+        self.assertEqual(skipped, [])
+        self.assertEqual(results["speed"], "done")
+
+    def test_errors_propagate(self):
+        def broken(token):
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            run_tasks({"speed": broken, "safety": lambda token: {"unsafe": False}}, [UNSAFE_RULE])
+
+
+class StreamCancellationTests(unittest.TestCase):
+    def setUp(self):
+        # Every call takes 5 s upstream, with 2.5 s of silence between deltas, so
+        # only tearing down the connection (not waiting for the next read) is prompt
+        self.upstream = start_fake_upstreams(
+            FakeUpstreamConfig(median_ms=5000, sigma=0.0, unsafe_rate=0.0, stream_delta_ms=2500))
+        self.addCleanup(self.upstream.server_close)
+        self.addCleanup(self.upstream.shutdown)
+        base_url = "http://%s:%d/v1" % self.upstream.server_address
+        client = OpenAI(base_url=base_url, api_key="fake-key", max_retries=0)
+        self.addCleanup(client.close)
+        patcher = mock.patch.object(ai, "_client", client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def call(self, token):
+        return ai._create_response(
+            token,
+            model="fake",
+            instructions="You are an expert in playback speed",
+            input=[{"role": "user", "content": "frames"}],
+        )
+
+    def test_cancel_drops_the_connection_promptly(self):
+        token = CancelToken()
+        outcome = {}
+
+        def agent():
+            try:
+                outcome["result"] = self.call(token)
+            except AgentCancelled:
+                outcome["cancelled"] = time.monotonic()
+
+        thread = threading.Thread(target=agent)
+        thread.start()
+        time.sleep(0.5)
+        cancelled_at = time.monotonic()
+        token.cancel()
+        thread.join(5)
+
+        self.assertIn("cancelled", outcome)
+        self.assertLess(outcome["cancelled"] - cancelled_at, 0.5)
+        # The upstream sees the disconnect and stops generating
+        deadline = time.monotonic() + 2
+        while not self.upstream.disconnects and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.upstream.disconnects), 1)
+        self.assertLess(self.upstream.disconnects[0] - cancelled_at, 0.5)
+
+    def test_uncancelled_stream_completes(self):
+        self.upstream.config.median_ms = 200
+        response = self.call(CancelToken())
+        self.assertIn("needs_slower_playback", response.output[0].content[0].text)
+        self.assertEqual(self.upstream.disconnects, [])
+
+    def test_cancelled_before_start(self):
+        token = CancelToken()
+        token.cancel()
+        with self.assertRaises(AgentCancelled):
+            self.call(token)
+
+
+# Runs in a fresh interpreter: the first streamed calls of a process must all
+# parse correctly even when the three agents make them at the same moment
+CONCURRENT_AGENTS_SCRIPT = """
+import json
+from baby_shield_backend import ai
+from baby_shield_backend.orchestration import run_tasks
+
+frames = ["AAAA"] * 2
+results, skipped = run_tasks({
+    "playback_speed_analysis": lambda token: ai.playback_speed_agent(frames, cancel_token=token),
+    "color_contrast_analysis": lambda token: ai.color_contrast_agent(frames, cancel_token=token),
+    "content_safety_analysis": lambda token: ai.content_safety_agent(frames, cancel_token=token),
+}, rules=[])
+print(json.dumps(results))
+"""
+
+
+class ConcurrentFirstStreamTests(unittest.TestCase):
+    def test_agents_stream_concurrently_in_fresh_process(self):
+        upstream = start_fake_upstreams(FakeUpstreamConfig(median_ms=200, sigma=0.0, unsafe_rate=0.0))
+        self.addCleanup(upstream.server_close)
+        self.addCleanup(upstream.shutdown)
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(
+            os.environ,
+            OPENAI_BASE_URL="http://%s:%d/v1" % upstream.server_address,
+            OPENAI_API_KEY="fake-key",
+        )
+        for _ in range(3):
+            proc = subprocess.run(
+                [sys.executable, "-c", CONCURRENT_AGENTS_SCRIPT],
+                cwd=backend_dir, env=env, capture_output=True, text=True, timeout=60,
+            )
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+            results = json.loads(proc.stdout.strip().splitlines()[-1])
+            self.assertFalse(results["playback_speed_analysis"]["needs_slower_playback"])
+            self.assertFalse(results["color_contrast_analysis"]["needs_reduced_contrast"])
+            self.assertFalse(results["content_safety_analysis"]["contains_inappropriate_content"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import time
+import unittest
+
+from baby_shield_backend.governor import LLMGovernor, TokenBucket, estimate_tokens, parse_duration
+
+
+class ParseDurationTests(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_duration("1.5"), 1.5)
+        self.assertEqual(parse_duration("6m0s"), 360)
+        self.assertAlmostEqual(parse_duration("20ms"), 0.02)
+        self.assertAlmostEqual(parse_duration("1m30.5s"), 90.5)
+        self.assertIsNone(parse_duration(""))
+        self.assertIsNone(parse_duration("soon"))
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_unlimited(self):
+        bucket = TokenBucket()
+        self.assertEqual(bucket.wait_time(10 ** 9, time.monotonic()), 0.0)
+
+    def test_wait_time_and_refill(self):
+        bucket = TokenBucket(per_minute=60)
+        now = time.monotonic()
+        bucket.take(60)
+        self.assertAlmostEqual(bucket.wait_time(1, now), 1.0, places=2)
+        # One per second refill
+        self.assertEqual(bucket.wait_time(1, now + 1.5), 0.0)
+
+    def test_sync_learns_limit_and_remaining(self):
+        bucket = TokenBucket()
+        now = time.monotonic()
+        bucket.sync(limit=1000, remaining=100, now=now)
+        self.assertEqual(bucket.capacity, 1000)
+        self.assertEqual(bucket.level, 100)
+        # A configured capacity wins over the header
+        bucket.sync(limit=5000, remaining=None, now=now)
+        self.assertEqual(bucket.capacity, 1000)
+
+    def test_give_back_is_capped(self):
+        bucket = TokenBucket(per_minute=100)
+        bucket.give_back(50)
+        self.assertEqual(bucket.level, 100)
+
+
+class LLMGovernorTests(unittest.TestCase):
+    def test_additive_increase(self):
+        governor = LLMGovernor(max_concurrency=8)
+        governor.limit = 4.0
+        release = governor.try_acquire(0)
+        release(True)
+        self.assertAlmostEqual(governor.limit, 4.25)
+        self.assertEqual(governor.in_flight, 0)
+
+    def test_failure_does_not_grow(self):
+        governor = LLMGovernor(max_concurrency=8)
+        governor.limit = 4.0
+        governor.try_acquire(0)(False)
+        self.assertEqual(governor.limit, 4.0)
+
+    def test_increase_capped_at_max(self):
+        governor = LLMGovernor(max_concurrency=2)
+        for _ in range(10):
+            governor.try_acquire(0)(True)
+        self.assertEqual(governor.limit, 2.0)
+
+    def test_rate_limit_halves_and_pauses(self):
+        governor = LLMGovernor(max_concurrency=8)
+        governor.on_rate_limited({"retry-after-ms": "500"})
+        self.assertEqual(governor.limit, 4.0)
+        self.assertIsNone(governor.try_acquire(0))
+        self.assertEqual(governor.stats()["rate_limited"], 1)
+
+    def test_observe_syncs_buckets_and_pauses_when_exhausted(self):
+        governor = LLMGovernor(max_concurrency=8)
+        governor.observe({
+            "x-ratelimit-limit-requests": "100",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "2s",
+            "x-ratelimit-limit-tokens": "10000",
+            "x-ratelimit-remaining-tokens": "9000",
+        })
+        self.assertEqual(governor._requests.capacity, 100)
+        self.assertEqual(governor._tokens.level, 9000)
+        self.assertIsNone(governor.try_acquire(0))
+
+    def test_token_budget_refuses_hedge(self):
+        governor = LLMGovernor(max_concurrency=8, tokens_per_minute=1000)
+        governor.try_acquire(900)(True)
+        self.assertIsNone(governor.try_acquire(900))
+        # Reported usage below the estimate is refunded
+        governor.settle_tokens(900, 100)
+        self.assertIsNotNone(governor.try_acquire(900))
+
+    def test_queue_timeout(self):
+        governor = LLMGovernor(max_concurrency=1)
+        governor.acquire(0, time.monotonic() + 1)
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            governor.acquire(0, time.monotonic() + 0.2)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(governor.stats()["queue_timeouts"], 1)
+        self.assertEqual(governor.waiting, 0)
+        self.assertEqual(governor.in_flight, 1)
+
+    def test_estimate_tokens(self):
+        messages = [{"role": "user", "content": [
+            {"type": "input_text", "text": "x" * 400},
+            {"type": "input_image", "image_url": "data:"},
+        ]}]
+        self.assertEqual(estimate_tokens(messages, 500), 500 + 100 + 765)
+
+
+if __name__ == "__main__":
+    unittest.main()
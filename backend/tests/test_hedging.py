@@ -0,0 +1,136 @@
+import threading
+import time
+import unittest
+
+from baby_shield_backend.hedging import HedgePolicy
+from baby_shield_backend.orchestration import AgentCancelled
+
+
+class SlotCounter:
+    """Stand-in for the governor's slots: counts requests holding one."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def acquire(self):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+        def release(success):
+            with self.lock:
+                self.in_flight -= 1
+        return release
+
+    def wait_idle(self, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.in_flight == 0
+
+
+class HedgePolicyTests(unittest.TestCase):
+    def policy(self, timeout=5.0):
+        policy = HedgePolicy(percentile=95, budget=1.0, timeout=timeout, max_workers=8)
+        # Hedge after 0.1 s
+        policy.deadline = lambda name: 0.1
+        return policy
+
+    def test_fast_call_is_not_hedged(self):
+        policy = self.policy()
+        slots = SlotCounter()
+        self.assertEqual(policy.call("agent", lambda: "ok", slot=slots.acquire, hedge_slot=slots.acquire), "ok")
+        self.assertEqual(policy.stats()["hedges_sent"], 0)
+        self.assertTrue(slots.wait_idle())
+
+    def test_losing_primary_keeps_its_slot(self):
+        policy = self.policy()
+        slots = SlotCounter()
+        calls = []
+        primary_done = threading.Event()
+
+        def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                primary_done.set()
+                return "primary"
+            return "hedge"
+
+        self.assertEqual(policy.call("agent", fn, slot=slots.acquire, hedge_slot=slots.acquire), "hedge")
+        self.assertEqual(policy.stats()["hedge_wins"], 1)
+        # The primary is still running upstream, so it still counts
+        self.assertFalse(primary_done.is_set())
+        self.assertEqual(slots.in_flight, 1)
+        self.assertEqual(slots.peak, 2)
+        self.assertTrue(slots.wait_idle())
+
+    def test_refused_hedge_slot(self):
+        policy = self.policy()
+        slots = SlotCounter()
+
+        def slow():
+            time.sleep(0.3)
+            return "primary"
+
+        self.assertEqual(policy.call("agent", slow, slot=slots.acquire, hedge_slot=lambda: None), "primary")
+        stats = policy.stats()
+        self.assertEqual(stats["hedges_sent"], 0)
+        self.assertEqual(stats["hedges_denied"], 1)
+        self.assertTrue(slots.wait_idle())
+
+    def test_timeout_keeps_slots_until_requests_end(self):
+        policy = self.policy(timeout=0.3)
+        slots = SlotCounter()
+
+        def slow():
+            time.sleep(0.6)
+            return "late"
+
+        with self.assertRaises(TimeoutError):
+            policy.call("agent", slow, slot=slots.acquire, hedge_slot=slots.acquire)
+        self.assertEqual(slots.in_flight, 2)
+        self.assertTrue(slots.wait_idle())
+
+    def test_error_then_hedge_success(self):
+        policy = self.policy()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.2)
+                raise ConnectionError("primary failed")
+            time.sleep(0.3)
+            return "hedge"
+
+        self.assertEqual(policy.call("agent", fn), "hedge")
+
+    def test_all_attempts_fail(self):
+        policy = self.policy()
+
+        def fail():
+            raise ValueError("bad")
+
+        with self.assertRaises(ValueError):
+            policy.call("agent", fail)
+        self.assertEqual(policy.stats()["errors"], 1)
+
+
+    def test_cancellation_is_not_an_error(self):
+        policy = self.policy()
+
+        def cancelled():
+            raise AgentCancelled()
+
+        with self.assertRaises(AgentCancelled):
+            policy.call("agent", cancelled)
+        stats = policy.stats()
+        self.assertEqual(stats["cancelled"], 1)
+        self.assertEqual(stats["errors"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from baby_shield_backend import snapshot
+from baby_shield_backend.snapshot import VerdictSnapshot, canonical_video_id, write_snapshot
+
+
+class SnapshotRoundTripTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "verdicts.snap")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def round_trip(self, items):
+        count = write_snapshot(self.path, items)
+        snap = VerdictSnapshot(self.path)
+        self.addCleanup(snap.close)
+        self.assertEqual(len(snap), count)
+        return snap
+
+    def test_empty(self):
+        snap = self.round_trip([])
+        self.assertEqual(len(snap), 0)
+        self.assertIsNone(snap.get("youtube:abc"))
+
+    def test_single(self):
+        snap = self.round_trip([("youtube:abc", b'{"reduceSpeed":false}')])
+        self.assertEqual(snap.get("youtube:abc"), b'{"reduceSpeed":false}')
+        self.assertIsNone(snap.get("youtube:abd"))
+
+    def test_many_and_last_duplicate_wins(self):
+        items = [(f"video-{i}", f'{{"i":{i}}}'.encode()) for i in range(1000)]
+        items.append(("video-7", b'{"i":"new"}'))
+        snap = self.round_trip(items)
+        self.assertEqual(len(snap), 1000)
+        for i in range(1000):
+            expected = b'{"i":"new"}' if i == 7 else f'{{"i":{i}}}'.encode()
+            self.assertEqual(snap.get(f"video-{i}"), expected)
+        self.assertIsNone(snap.get("video-1000"))
+
+    def test_hash_collisions(self):
+        # Every key in one probe chain, some with identical hashes
+        with mock.patch.object(snapshot, "key_hash", lambda key: 42 if key.startswith(b"a") else 43):
+            snap = self.round_trip([("a1", b"1"), ("a2", b"2"), ("b1", b"3"), ("a3", b"4")])
+            self.assertEqual(snap.get("a1"), b"1")
+            self.assertEqual(snap.get("a2"), b"2")
+            self.assertEqual(snap.get("b1"), b"3")
+            self.assertEqual(snap.get("a3"), b"4")
+            self.assertIsNone(snap.get("a4"))
+            self.assertIsNone(snap.get("b2"))
+
+    def test_file_is_readable_by_others(self):
+        old = os.umask(0o022)
+        try:
+            write_snapshot(self.path, [("x", b"1")])
+        finally:
+            os.umask(old)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o644)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot at all, just some bytes")
+        with self.assertRaises(ValueError):
+            VerdictSnapshot(self.path)
+
+
+class CanonicalVideoIdTests(unittest.TestCase):
+    def test_youtube_spellings_match(self):
+        for url in (
+            "https://www.youtube.com/watch?v=abc123&t=10s",
+            "https://youtu.be/abc123?si=xyz",
+            "https://m.youtube.com/shorts/abc123",
+            "https://www.youtube.com/embed/abc123",
+        ):
+            self.assertEqual(canonical_video_id(url), "youtube:abc123", url)
+
+    def test_other_urls_drop_tracking(self):
+        self.assertEqual(
+            canonical_video_id("https://www.example.com/v/1/?utm_source=x&b=2&a=1"),
+            "example.com/v/1?a=1&b=2",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
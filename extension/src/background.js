@@ -117,6 +117,7 @@ class BabyShieldBackground {
         actions: {
           reduceSpeed: false,
           applyFilters: false,
+          capVolume: false,
           showWarning: false
         }
       };
@@ -182,6 +182,11 @@ class VideoInterceptor {
         this.applyVisualFilters(videoElement, actions.filters || ['tone-down']);
       }
 
+      // Cap volume (sudden loud sounds or sustained loudness)
+      if (actions.capVolume) {
+        this.capVolume(videoElement, actions.volumeLevel ?? 0.5);
+      }
+
       // Show warning
       if (actions.showWarning) {
         this.showWarning(videoElement, videoData, actions.warningMessage);
@@ -194,6 +199,22 @@ class VideoInterceptor {
     videoElement.playbackRate = speedFactor;
   }
 
+  capVolume(videoElement, volumeLevel) {
+    console.log(`BabyShield: Capping volume at ${volumeLevel}`);
+    videoElement.volume = Math.min(videoElement.volume, volumeLevel);
+
+    // Keep the cap if the page or the user turns the volume back up
+    if (!videoElement.dataset.babyshieldVolumeCap) {
+      videoElement.addEventListener('volumechange', () => {
+        const cap = parseFloat(videoElement.dataset.babyshieldVolumeCap);
+        if (videoElement.volume > cap) {
+          videoElement.volume = cap;
+        }
+      });
+    }
+    videoElement.dataset.babyshieldVolumeCap = String(volumeLevel);
+  }
+
   applyVisualFilters(videoElement, filters) {
     console.log('BabyShield: Applying visual filters:', filters);
     